@@ -0,0 +1,209 @@
+import numpy as np
+
+from seeding import make_rng, UniformBlock
+
+
+SCHEDULES =['constant', 'linear', 'exponential', 'visit']
+EXPLORATION= ['epsilon_greedy', 'softmax', 'ucb']
+
+
+class Schedule:
+    # decays an exploration parameter (epsilon or softmax temperature).
+    # decay means: linear -> fraction of the run spent decaying,
+    # exponential -> per-episode multiplier, visit -> rate in start/(1+decay*n_visits)
+    def __init__(self, kind='constant', start=0.1, end=0.01, decay=None, n_episodes=500):
+        if kind not in SCHEDULES:
+            raise ValueError('unknown schedule: %s' % kind)
+        if decay is None:
+            decay ={'constant': 0.0, 'linear': 0.5, 'exponential': 0.99, 'visit': 0.1}[kind]
+
+        self.kind =kind
+        self.start= start
+        self.end =min(end, start)
+        self.decay= decay
+        self.n_episodes =max(1, n_episodes)
+        self.per_state= kind =='visit'
+
+    def __call__(self, ep, visits=0):
+        if self.kind== 'constant':
+            return self.start
+        if self.kind =='linear':
+            frac= min(1.0, ep/ max(1.0, self.decay* self.n_episodes))
+            return self.start+ (self.end- self.start)* frac
+        if self.kind== 'exponential':
+            return max(self.end, self.start* self.decay**ep)
+        return max(self.end, self.start/ (1.0+ self.decay* visits))
+
+
+def greedy_batch(q_rows, u_tie):
+    # argmax per row with ties broken uniformly at random using one draw per row
+    best =q_rows.max(axis=1, keepdims=True)
+    ties= q_rows ==best
+    n_ties =ties.sum(axis=1)
+    k= np.minimum((u_tie* n_ties).astype(np.int64), n_ties- 1)
+    return np.argmax(np.cumsum(ties, axis=1)> k[:, None], axis=1)
+
+
+def epsilon_greedy_batch(q_rows, epsilon, u_explore, u_tie):
+    na =q_rows.shape[1]
+    acts= greedy_batch(q_rows, u_tie)
+    epsilon =np.broadcast_to(np.asarray(epsilon, dtype=float), u_explore.shape)
+    explore= u_explore< epsilon
+    if explore.any():
+        rand_a =np.minimum((u_explore[explore]/ epsilon[explore]* na).astype(np.int64), na- 1)
+        acts[explore]= rand_a
+    return acts
+
+
+def softmax_batch(q_rows, temperature, u):
+    temperature =np.maximum(np.asarray(temperature, dtype=float), 1e-8)
+    if temperature.ndim:
+        temperature= temperature[:, None]
+    z =(q_rows- q_rows.max(axis=1, keepdims=True))/ temperature
+    cdf= np.cumsum(np.exp(z), axis=1)
+    acts =(cdf< (u* cdf[:, -1])[:, None]).sum(axis=1)
+    return np.minimum(acts, q_rows.shape[1]- 1)
+
+
+def ucb_batch(q_rows, counts_rows, c, u_tie):
+    # untried actions get an infinite bonus so each one is tried first
+    n_s =counts_rows.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bonus= c* np.sqrt(np.log(n_s+ 1.0)/ counts_rows)
+    bonus[counts_rows== 0] =np.inf
+    return greedy_batch(q_rows+ bonus, u_tie)
+
+
+class _Selector:
+    def __init__(self, n_actions, rng=None, schedule=None, n_states=None):
+        self.na =n_actions
+        self.draws= UniformBlock(make_rng(rng))
+        self.schedule =schedule if schedule is not None else Schedule()
+        self.ep= 0
+        self.param =self.schedule(0)
+        self.visits= None
+        if self.schedule.per_state:
+            if n_states is None:
+                raise ValueError('visit-count schedule needs n_states')
+            self.visits =np.zeros(n_states, dtype=np.int64)
+
+    def begin_episode(self, ep):
+        self.ep =ep
+        if not self.schedule.per_state:
+            self.param= self.schedule(ep)
+
+    def _param_for(self, sid):
+        if self.visits is None:
+            return self.param
+        p =self.schedule(self.ep, self.visits[sid])
+        self.visits[sid]+= 1
+        return p
+
+    def _peek_param(self, sid):
+        # the parameter select() would use in sid next, without counting a visit
+        if self.visits is None:
+            return self.param
+        return self.schedule(self.ep, self.visits[sid])
+
+    def _params_for(self, sids):
+        if self.visits is None:
+            return self.param
+        p =np.array([self.schedule(self.ep, n) for n in self.visits[sids]])
+        np.add.at(self.visits, sids, 1)
+        return p
+
+    def _greedy(self, q_row):
+        # rows are n_actions long, so plain python beats numpy calls here;
+        # the tie list is only built when the max is not unique
+        row =q_row.tolist()
+        best= max(row)
+        if row.count(best)== 1:
+            return row.index(best)
+        ties =[i for i, v in enumerate(row) if v== best]
+        return ties[self.draws.integer(len(ties))]
+
+
+class EpsilonGreedy(_Selector):
+    def select(self, q_row, sid):
+        # constant/per-episode schedules keep epsilon cached in self.param
+        eps =self.param if self.visits is None else self._param_for(sid)
+        u= self.draws.next()
+        if u< eps:
+            # u/eps is itself uniform on [0,1), so reuse it for the random action
+            return min(int(u/ eps* self.na), self.na- 1)
+        return self._greedy(q_row)
+
+    def probs(self, q_row, sid):
+        # ties share the greedy mass, matching the random tie break
+        eps =self._peek_param(sid)
+        best= q_row== q_row.max()
+        return eps/ self.na+ (1.0- eps)* best/ best.sum()
+
+    def select_batch(self, q_rows, sids):
+        n =len(q_rows)
+        return epsilon_greedy_batch(q_rows, self._params_for(sids), self.draws.take(n), self.draws.take(n))
+
+
+class Softmax(_Selector):
+    def select(self, q_row, sid):
+        temp =max(self._param_for(sid), 1e-8)
+        w= np.exp((q_row- q_row.max())/ temp)
+        cdf =np.cumsum(w)
+        a= int(np.searchsorted(cdf, self.draws.next()* cdf[-1], side='right'))
+        return min(a, self.na- 1)
+
+    def probs(self, q_row, sid):
+        temp =max(self._peek_param(sid), 1e-8)
+        w= np.exp((q_row- q_row.max())/ temp)
+        return w/ w.sum()
+
+    def select_batch(self, q_rows, sids):
+        return softmax_batch(q_rows, self._params_for(sids), self.draws.take(len(q_rows)))
+
+
+class UCB(_Selector):
+    def __init__(self, n_actions, n_states, rng=None, c=1.0):
+        super().__init__(n_actions, rng, Schedule('constant', c))
+        self.counts =np.zeros((n_states, n_actions), dtype=np.int64)
+
+    def select(self, q_row, sid):
+        cnt =self.counts[sid]
+        untried= np.flatnonzero(cnt== 0)
+        if len(untried):
+            a =int(untried[self.draws.integer(len(untried))])
+        else:
+            a= self._greedy(q_row+ self.param* np.sqrt(np.log(cnt.sum()+ 1.0)/ cnt))
+        cnt[a] +=1
+        return a
+
+    def probs(self, q_row, sid):
+        # uniform over untried actions, otherwise over the best ucb scores
+        cnt =self.counts[sid]
+        if (cnt== 0).any():
+            best =cnt== 0
+        else:
+            score= q_row+ self.param* np.sqrt(np.log(cnt.sum()+ 1.0)/ cnt)
+            best =score== score.max()
+        return best/ best.sum()
+
+    def select_batch(self, q_rows, sids):
+        acts =ucb_batch(q_rows, self.counts[sids], self.param, self.draws.take(len(q_rows)))
+        np.add.at(self.counts, (sids, acts), 1)
+        return acts
+
+
+def make_selector(env, params, rng=None, n_episodes=500):
+    kind =params.get('exploration', 'epsilon_greedy')
+    sched_kind= params.get('epsilon_schedule', 'constant')
+
+    if kind =='epsilon_greedy':
+        sched= Schedule(sched_kind, params.get('epsilon', 0.1), params.get('epsilon_min', 0.01),
+                        params.get('epsilon_decay'), n_episodes)
+        return EpsilonGreedy(env.n_actions, rng, sched, env.n_states)
+    elif kind== 'softmax':
+        sched =Schedule(sched_kind, params.get('temperature', 1.0), params.get('temperature_min', 0.05),
+                        params.get('epsilon_decay'), n_episodes)
+        return Softmax(env.n_actions, rng, sched, env.n_states)
+    elif kind =='ucb':
+        return UCB(env.n_actions, env.n_states, rng, params.get('ucb_c', 1.0))
+    raise ValueError('unknown exploration: %s' % kind)
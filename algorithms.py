@@ -1,15 +1,30 @@
 import numpy as np
-import random
 from collections import defaultdict
 
+from seeding import make_rng, split_rng
+from action_selection import EpsilonGreedy, Schedule, make_selector
+from convergence import monitor_from_params
+from replay import batched_q_update, make_replay
+from seeding import UniformBlock
+from td_core import td_targets, td_update
+from hogwild import hogwild_q_learning
+from tabular_model import TabularModel
 
-def q_learning(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500):
+
+def q_learning(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500, callback=None, rng=None, selector=None,
+               monitor=None, replay=None, batch_size=32, replay_ratio=1.0, recorder=None):
     ns =env.n_states
     na= env.n_actions
     q_table = np.zeros((ns, na))
     rewards_history =[]
+    if selector is None:
+        selector= EpsilonGreedy(na, rng, Schedule('constant', epsilon))
+    replay_credit =0.0
+    if recorder is not None:
+        recorder.record(0, q=q_table)
 
     for ep in range(n_episodes):
+        selector.begin_episode(ep)
         s=env.reset()
         finished =False
         total_r=0
@@ -18,46 +33,66 @@ def q_learning(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500):
         while not finished and step_cnt<1000:
             sid =env.state_to_idx(s)
 
-            # epsilon greedy action selection
-            if random.random()< epsilon:
-                a= random.randint(0, na-1)
-            else:
-                a =np.argmax(q_table[sid])
+            a =selector.select(q_table[sid], sid)
 
             s_next,r, finished = env.step(a)
             sid_next =env.state_to_idx(s_next)
             total_r +=r
 
             # off-policy update with max q
-            if finished:
-                q_table[sid, a] +=alpha * (r - q_table[sid, a])
-            else:
-                best_next =np.max(q_table[sid_next])
-                q_table[sid, a]+= alpha* (r+ gamma*best_next - q_table[sid,a])
+            d =alpha* td_update(q_table, (sid, a), td_targets('max', r, sid_next, finished, gamma, q_table), alpha)
+            if monitor is not None:
+                monitor.update(sid, q_table[sid], d)
+
+            # replay_ratio minibatches per real step (fractional ratios accumulate);
+            # no credit builds up while the buffer is still filling
+            if replay is not None:
+                replay.add(sid, a, r, sid_next, finished)
+                if len(replay)>= batch_size:
+                    replay_credit +=replay_ratio
+                while replay_credit>= 1.0:
+                    replay_credit -=1.0
+                    idx, bs, ba, br, bs2, bd, w =replay.sample(batch_size)
+                    td= batched_q_update(q_table, bs, ba, br, bs2, bd, alpha, gamma, w)
+                    replay.update_priorities(idx, td)
+                    if monitor is not None:
+                        for u_s in np.unique(bs):
+                            monitor.update(u_s, q_table[u_s], alpha* np.abs(td).max())
 
             s =s_next
             step_cnt+= 1
 
         rewards_history.append(total_r)
+        if callback is not None:
+            callback(ep, total_r)
+        if recorder is not None:
+            recorder.record(ep+ 1, q=q_table)
+        if monitor is not None and monitor.end_episode(ep, total_r):
+            break
 
+    if recorder is not None:
+        recorder.record(len(rewards_history), force=True, q=q_table)
     pol = np.argmax(q_table, axis=1)
     return pol, q_table, rewards_history
 
 
-def sarsa(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500):
+def sarsa(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500, callback=None, rng=None, selector=None,
+          monitor=None, recorder=None):
     ns= env.n_states
     na =env.n_actions
     q_vals =np.zeros((ns, na))
     hist= []
+    if selector is None:
+        selector =EpsilonGreedy(na, rng, Schedule('constant', epsilon))
+    if recorder is not None:
+        recorder.record(0, q=q_vals)
 
     for ep_num in range(n_episodes):
+        selector.begin_episode(ep_num)
         curr_state = env.reset()
         curr_idx=env.state_to_idx(curr_state)
 
-        if random.random() <epsilon:
-            curr_act= random.randint(0,na-1)
-        else:
-            curr_act =np.argmax(q_vals[curr_idx])
+        curr_act =selector.select(q_vals[curr_idx], curr_idx)
 
         done_flag =False
         ep_reward =0
@@ -68,17 +103,13 @@ def sarsa(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500):
             new_idx =env.state_to_idx(new_state)
             ep_reward+= rew
 
-            if random.random()<epsilon:
-                next_act =random.randint(0, na-1)
-            else:
-                next_act=np.argmax(q_vals[new_idx])
+            next_act =selector.select(q_vals[new_idx], new_idx)
 
             # on-policy update
-            if done_flag:
-                q_vals[curr_idx, curr_act]+= alpha* (rew- q_vals[curr_idx, curr_act])
-            else:
-                target =rew + gamma*q_vals[new_idx, next_act]
-                q_vals[curr_idx,curr_act] +=alpha * (target - q_vals[curr_idx, curr_act])
+            target =td_targets('sarsa', rew, new_idx, done_flag, gamma, q_vals, a2=next_act)
+            d= alpha* td_update(q_vals, (curr_idx, curr_act), target, alpha)
+            if monitor is not None:
+                monitor.update(curr_idx, q_vals[curr_idx], d)
 
             curr_state= new_state
             curr_idx= new_idx
@@ -86,12 +117,133 @@ def sarsa(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500):
             steps +=1
 
         hist.append(ep_reward)
+        if callback is not None:
+            callback(ep_num, ep_reward)
+        if recorder is not None:
+            recorder.record(ep_num+ 1, q=q_vals)
+        if monitor is not None and monitor.end_episode(ep_num, ep_reward):
+            break
 
+    if recorder is not None:
+        recorder.record(len(hist), force=True, q=q_vals)
     policy =np.argmax(q_vals, axis=1)
     return policy,q_vals, hist
 
 
-def monte_carlo(env, gamma=0.99, epsilon=0.1, n_episodes=500):
+def expected_sarsa(env, gamma=0.99, alpha=0.5, epsilon=0.1, n_episodes=500, callback=None, rng=None,
+                   selector=None, monitor=None, recorder=None):
+    ns =env.n_states
+    na= env.n_actions
+    q_vals =np.zeros((ns, na))
+    hist= []
+    if selector is None:
+        selector =EpsilonGreedy(na, rng, Schedule('constant', epsilon))
+    if recorder is not None:
+        recorder.record(0, q=q_vals)
+
+    for ep in range(n_episodes):
+        selector.begin_episode(ep)
+        # expectation is taken under the behaviour policy: the closed epsilon-greedy
+        # form when epsilon is fixed for the episode, its action probabilities otherwise
+        eps_now =selector.param if isinstance(selector, EpsilonGreedy) and selector.visits is None else None
+        st= env.reset()
+        done =False
+        ep_reward= 0
+        steps =0
+
+        while not done and steps< 1000:
+            sid= env.state_to_idx(st)
+            act =selector.select(q_vals[sid], sid)
+
+            st_next, rew, done= env.step(act)
+            sid_next =env.state_to_idx(st_next)
+            ep_reward +=rew
+
+            if eps_now is not None or done:
+                target= td_targets('expected', rew, sid_next, done, gamma, q_vals, epsilon=eps_now)
+            else:
+                target =td_targets('expected', rew, sid_next, done, gamma, q_vals,
+                                   probs=selector.probs(q_vals[sid_next], sid_next))
+            d =alpha* td_update(q_vals, (sid, act), target, alpha)
+            if monitor is not None:
+                monitor.update(sid, q_vals[sid], d)
+
+            st =st_next
+            steps+= 1
+
+        hist.append(ep_reward)
+        if callback is not None:
+            callback(ep, ep_reward)
+        if recorder is not None:
+            recorder.record(ep+ 1, q=q_vals)
+        if monitor is not None and monitor.end_episode(ep, ep_reward):
+            break
+
+    if recorder is not None:
+        recorder.record(len(hist), force=True, q=q_vals)
+    policy= np.argmax(q_vals, axis=1)
+    return policy, q_vals, hist
+
+
+def double_q_learning(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500, callback=None, rng=None,
+                      selector=None, monitor=None, recorder=None):
+    ns =env.n_states
+    na= env.n_actions
+    q_a =np.zeros((ns, na))
+    q_b= np.zeros((ns, na))
+    q_sum =np.zeros((ns, na))
+    hist= []
+    rng =make_rng(rng)
+    if selector is None:
+        selector= EpsilonGreedy(na, rng, Schedule('constant', epsilon))
+    coin =UniformBlock(rng)
+    if recorder is not None:
+        recorder.record(0, q=q_sum)
+
+    for ep in range(n_episodes):
+        selector.begin_episode(ep)
+        st =env.reset()
+        done= False
+        ep_reward =0
+        steps= 0
+
+        while not done and steps< 1000:
+            sid =env.state_to_idx(st)
+            # behave greedily w.r.t. the sum of both tables
+            act= selector.select(q_sum[sid], sid)
+
+            st_next, rew, done =env.step(act)
+            sid_next= env.state_to_idx(st_next)
+            ep_reward +=rew
+
+            # update one table at random, using the other to evaluate its argmax
+            upd, ev =(q_a, q_b) if coin.next()< 0.5 else (q_b, q_a)
+            target= td_targets('double', rew, sid_next, done, gamma, upd, other=ev)
+            d =alpha* td_update(upd, (sid, act), target, alpha)
+            q_sum[sid, act] =q_a[sid, act]+ q_b[sid, act]
+            if monitor is not None:
+                monitor.update(sid, q_sum[sid], d)
+
+            st= st_next
+            steps +=1
+
+        hist.append(ep_reward)
+        if callback is not None:
+            callback(ep, ep_reward)
+        if recorder is not None:
+            recorder.record(ep+ 1, q=q_sum/ 2)
+        if monitor is not None and monitor.end_episode(ep, ep_reward):
+            break
+
+    q =q_sum/ 2
+    if recorder is not None:
+        recorder.record(len(hist), force=True, q=q)
+    pol= np.argmax(q, axis=1)
+    return pol, q, hist
+
+
+def monte_carlo(env, gamma=0.99, epsilon=0.1, n_episodes=500, callback=None, rng=None, selector=None,
+                monitor=None, recorder=None):
     ns =env.n_states
     na =env.n_actions
 
@@ -99,8 +251,13 @@ def monte_carlo(env, gamma=0.99, epsilon=0.1, n_episodes=500):
     ret_sum =defaultdict(float)
     ret_cnt= defaultdict(int)
     h =[]
+    if selector is None:
+        selector= EpsilonGreedy(na, rng, Schedule('constant', epsilon))
+    if recorder is not None:
+        recorder.record(0, q=q)
 
     for e in range(n_episodes):
+        selector.begin_episode(e)
         traj =[]
         st =env.reset()
         is_done= False
@@ -110,10 +267,7 @@ def monte_carlo(env, gamma=0.99, epsilon=0.1, n_episodes=500):
         while not is_done and step_count <max_step:
             s_i =env.state_to_idx(st)
 
-            if random.random() <epsilon:
-                act =random.randint(0, na-1)
-            else:
-                act= np.argmax(q[s_i])
+            act =selector.select(q[s_i], s_i)
 
             st_next, reward,is_done = env.step(act)
             traj.append((st, act,reward))
@@ -134,22 +288,38 @@ def monte_carlo(env, gamma=0.99, epsilon=0.1, n_episodes=500):
                 seen.add((s_idx, action))
                 ret_sum[(s_idx,action)] +=g_val
                 ret_cnt[(s_idx, action)]+=1
-                q[s_idx,action] = ret_sum[(s_idx, action)]/ ret_cnt[(s_idx, action)]
+                new_q =ret_sum[(s_idx, action)]/ ret_cnt[(s_idx, action)]
+                if monitor is not None:
+                    d= new_q- q[s_idx, action]
+                    q[s_idx,action] = new_q
+                    monitor.update(s_idx, q[s_idx], d)
+                else:
+                    q[s_idx,action] = new_q
 
         avg =np.mean(np.max(q, axis=1))
         h.append(avg)
+        if callback is not None:
+            callback(e, avg)
+        if recorder is not None:
+            recorder.record(e+ 1, q=q)
+        if monitor is not None and monitor.end_episode(e, sum(step[2] for step in traj)):
+            break
 
+    if recorder is not None:
+        recorder.record(len(h), force=True, q=q)
     pol= np.argmax(q, axis=1)
     return pol, q,h
 
 
-def value_iteration(env, gamma=0.99, theta=1e-6):
+def value_iteration(env, gamma=0.99, theta=1e-6, callback=None, recorder=None):
     num_s =env.n_states
     num_a= env.n_actions
     v= np.zeros(num_s)
     conv_hist =[]
 
     iter_count= 0
+    if recorder is not None:
+        recorder.record(0, v=v)
     while True:
         max_change =0
 
@@ -171,7 +341,11 @@ def value_iteration(env, gamma=0.99, theta=1e-6):
             max_change =max(max_change, abs(old_v -v[si]))
 
         conv_hist.append(max_change)
+        if callback is not None:
+            callback(iter_count, max_change)
         iter_count +=1
+        if recorder is not None:
+            recorder.record(iter_count, v=v)
 
         if max_change< theta:
             break
@@ -179,6 +353,8 @@ def value_iteration(env, gamma=0.99, theta=1e-6):
             break
 
     p =make_greedy_policy(env,v, gamma)
+    if recorder is not None:
+        recorder.record(iter_count, force=True, v=v)
     return p, v,conv_hist
 
 
@@ -206,33 +382,113 @@ def make_greedy_policy(env, values, gamma=0.99):
     return pol
 
 
-def policy_iteration(env, gamma=0.99, theta=1e-6):
+def policy_iteration(env, gamma=0.99, theta=1e-6, callback=None, rng=None, recorder=None):
     num_st =env.n_states
     num_act =env.n_actions
 
-    pi= np.random.randint(0, num_act, size=num_st)
+    pi= make_rng(rng).integers(0, num_act, size=num_st)
     val_func =np.zeros(num_st)
 
     all_conv_hist=[]
     iters =0
+    if recorder is not None:
+        recorder.record(0, v=val_func, policy=pi)
 
     while True:
         val_func, eval_h =evaluate_policy(env, pi,gamma, theta)
+        if callback is not None:
+            for i, d in enumerate(eval_h):
+                callback(len(all_conv_hist)+ i, d)
         all_conv_hist.extend(eval_h)
 
         prev_pi= pi.copy()
         pi= make_greedy_policy(env, val_func, gamma)
 
         iters+=1
+        if recorder is not None:
+            recorder.record(iters, v=val_func, policy=pi)
 
         if np.array_equal(prev_pi, pi):
             break
         if iters >100:
             break
 
+    if recorder is not None:
+        recorder.record(iters, force=True, v=val_func, policy=pi)
     return pi, val_func,all_conv_hist
 
 
+def modified_policy_iteration(env, gamma=0.99, theta=1e-6, eval_sweeps=10, callback=None, rng=None,
+                              recorder=None):
+    model =TabularModel(env)
+    num_st= env.n_states
+    num_act =env.n_actions
+
+    pi= make_rng(rng).integers(0, num_act, size=num_st)
+    val_func =np.zeros(num_st)
+    all_states= np.arange(num_st)
+
+    all_conv_hist =[]
+    iters= 0
+    backups =0
+    # frontier: states whose backup can differ from their current value.
+    # stale: states whose q row changed since the last improvement
+    frontier= all_states
+    stale =all_states
+    v_seen= val_func.copy()
+    if recorder is not None:
+        recorder.record(0, v=val_func, policy=pi)
+
+    while True:
+        # warm-started evaluation, at most eval_sweeps jacobi sweeps over the frontier
+        delta =0.0
+        for _ in range(eval_sweeps):
+            if len(frontier)== 0:
+                delta =0.0
+                break
+            new_v= model.backup(frontier* num_act+ pi[frontier], val_func, gamma)
+            backups +=len(frontier)
+            diff= np.abs(new_v- val_func[frontier])
+            val_func[frontier] =new_v
+            delta= float(diff.max())
+
+            if callback is not None:
+                callback(len(all_conv_hist), delta)
+            all_conv_hist.append(delta)
+
+            frontier =model.predecessors(frontier[diff> 0])
+            if delta< theta:
+                break
+
+        # improvement only where a successor's value moved since last time;
+        # every other q row is unchanged, so its argmax is too
+        moved =np.flatnonzero(val_func!= v_seen)
+        stale= np.union1d(stale, model.predecessors(moved))
+        v_seen[:] =val_func
+
+        q= model.backup((stale[:, None]* num_act+ np.arange(num_act)).ravel(), val_func, gamma)
+        backups +=len(stale)* num_act
+        best= q.reshape(-1, num_act).argmax(axis=1)
+        flipped =stale[best!= pi[stale]]
+        pi[stale]= best
+        stale =stale[:0]
+        # a state whose action changed needs a fresh backup
+        frontier= np.union1d(frontier, flipped)
+
+        iters +=1
+        if recorder is not None:
+            recorder.record(iters, v=val_func, policy=pi)
+
+        if len(flipped)== 0 and delta< theta:
+            break
+        if iters> 10000:
+            break
+
+    if recorder is not None:
+        recorder.record(iters, force=True, v=val_func, policy=pi)
+    return pi, val_func, all_conv_hist, backups
+
+
 def evaluate_policy(env, policy,gamma=0.99, theta=1e-6):
     n_st =env.n_states
     v_arr= np.zeros(n_st)
@@ -269,13 +525,17 @@ def evaluate_policy(env, policy,gamma=0.99, theta=1e-6):
     return v_arr,convergence
 
 
-def td_prediction(env, pol, gamma=0.99, alpha=0.1, n_episodes=500):
+def td_prediction(env, pol, gamma=0.99, alpha=0.1, n_episodes=500, callback=None, monitor=None,
+                  recorder=None):
     n_states= env.n_states
     v_est =np.zeros(n_states)
     tracking =[]
+    if recorder is not None:
+        recorder.record(0, v=v_est)
 
     for episode in range(n_episodes):
         state_now =env.reset()
+        ep_ret= 0
         finished= False
         cnt =0
 
@@ -286,25 +546,35 @@ def td_prediction(env, pol, gamma=0.99, alpha=0.1, n_episodes=500):
             state_nxt, r, finished =env.step(act)
             si_nxt =env.state_to_idx(state_nxt)
 
-            if finished:
-                td_targ =r
-            else:
-                td_targ= r +gamma * v_est[si_nxt]
-
-            v_est[si] =v_est[si] +alpha * (td_targ- v_est[si])
+            td_targ= td_targets('value', r, si_nxt, finished, gamma, v_est)
+            d =alpha* td_update(v_est, si, td_targ, alpha)
+            if monitor is not None:
+                monitor.update(si, None, d, v_est[si])
+                ep_ret +=r
 
             state_now =state_nxt
             cnt+= 1
 
         tracking.append(np.mean(v_est))
+        if callback is not None:
+            callback(episode, tracking[-1])
+        if recorder is not None:
+            recorder.record(episode+ 1, v=v_est)
+        if monitor is not None and monitor.end_episode(episode, ep_ret):
+            break
 
+    if recorder is not None:
+        recorder.record(len(tracking), force=True, v=v_est)
     return v_est, tracking
 
 
-def n_step_td(env, pol, n=4,gamma=0.99, alpha=0.1, n_episodes=500):
+def n_step_td(env, pol, n=4,gamma=0.99, alpha=0.1, n_episodes=500, callback=None, monitor=None,
+              recorder=None):
     n_st= env.n_states
     vals =np.zeros(n_st)
     progress =[]
+    if recorder is not None:
+        recorder.record(0, v=vals)
 
     for episode_num in range(n_episodes):
         s_curr =env.reset()
@@ -335,14 +605,16 @@ def n_step_td(env, pol, n=4,gamma=0.99, alpha=0.1, n_episodes=500):
                 for i in range(update_time +1, min(update_time+ n, terminal_time)+ 1):
                     ret +=(gamma**(i- update_time-1)) * reward_buf[i]
 
-                if update_time +n< terminal_time:
-                    s_tau_n= state_buf[update_time+ n]
-                    s_tau_n_i =env.state_to_idx(s_tau_n)
-                    ret +=(gamma**n) *vals[s_tau_n_i]
+                # bootstrap from v(s_{tau+n}) unless the episode ended first
+                cut =update_time +n>= terminal_time
+                s_tau_n_i= 0 if cut else env.state_to_idx(state_buf[update_time+ n])
+                ret =td_targets('value', ret, s_tau_n_i, cut, gamma**n, vals)
 
                 s_tau =state_buf[update_time]
                 s_tau_i= env.state_to_idx(s_tau)
-                vals[s_tau_i]+= alpha * (ret- vals[s_tau_i])
+                d= alpha* td_update(vals, s_tau_i, ret, alpha)
+                if monitor is not None:
+                    monitor.update(s_tau_i, None, d, vals[s_tau_i])
 
             if update_time ==terminal_time- 1:
                 break
@@ -352,11 +624,19 @@ def n_step_td(env, pol, n=4,gamma=0.99, alpha=0.1, n_episodes=500):
                 break
 
         progress.append(np.mean(vals))
+        if callback is not None:
+            callback(episode_num, progress[-1])
+        if recorder is not None:
+            recorder.record(episode_num+ 1, v=vals)
+        if monitor is not None and monitor.end_episode(episode_num, sum(reward_buf)):
+            break
 
+    if recorder is not None:
+        recorder.record(len(progress), force=True, v=vals)
     return vals, progress
 
 
-def run_algorithm(env, algo_name,params):
+def run_algorithm(env, algo_name,params, callback=None, rng=None, recorder=None):
     g =params.get('gamma', 0.99)
     a= params.get('alpha', 0.1)
     eps= params.get('epsilon', 0.1)
@@ -364,38 +644,82 @@ def run_algorithm(env, algo_name,params):
     convergence_thresh =params.get('theta', 1e-6)
     n_steps= params.get('n_step', 4)
 
+    # an explicit seed makes the env and learner streams reproducible
+    if rng is None:
+        rng =params.get('seed')
+    if rng is not None:
+        env_rng, rng =split_rng(rng)
+        env.seed(env_rng)
+    rng= make_rng(rng)
+    model_free =algo_name in ('monte_carlo', 'sarsa', 'q_learning', 'expected_sarsa', 'double_q_learning')
+    sel= make_selector(env, params, rng, episodes) if model_free else None
+    rep= make_replay(params, rng) if algo_name =='q_learning' else None
+    # the hogwild workers run in other processes, so no shared monitor there
+    mon =monitor_from_params(params) if algo_name not in ('policy_iteration', 'value_iteration',
+                                                          'modified_policy_iteration',
+                                                          'hogwild_q_learning') else None
+
     if algo_name== 'policy_iteration':
-        p, v, h= policy_iteration(env, g, convergence_thresh)
-        return {'policy': p.tolist(), 'values': v.tolist(),'history': h}
+        p, v, h= policy_iteration(env, g, convergence_thresh, callback, rng, recorder)
+        res ={'policy': p.tolist(), 'values': v.tolist(),'history': h}
+
+    elif algo_name =='modified_policy_iteration':
+        p, v, h, n_backups =modified_policy_iteration(env, g, convergence_thresh, params.get('eval_sweeps', 10),
+                                                      callback, rng, recorder)
+        res= {'policy': p.tolist(), 'values': v.tolist(), 'history': h, 'backups': n_backups}
 
     elif algo_name== 'value_iteration':
-        p,v, h =value_iteration(env, g, convergence_thresh)
-        return {'policy': p.tolist(), 'values': v.tolist(), 'history': h}
+        p,v, h =value_iteration(env, g, convergence_thresh, callback, recorder)
+        res ={'policy': p.tolist(), 'values': v.tolist(), 'history': h}
 
     elif algo_name =='monte_carlo':
-        p, q,h= monte_carlo(env, g, eps, episodes)
+        p, q,h= monte_carlo(env, g, eps, episodes, callback, rng, sel, mon, recorder)
         v= np.max(q, axis=1)
-        return {'policy': p.tolist(),'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
+        res ={'policy': p.tolist(),'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
 
     elif algo_name== 'td':
-        rand_pol =np.random.randint(0, env.n_actions, size=env.n_states)
-        v, h =td_prediction(env, rand_pol, g,a, episodes)
-        return {'policy': rand_pol.tolist(), 'values':v.tolist(), 'history': h}
+        rand_pol =rng.integers(0, env.n_actions, size=env.n_states)
+        v, h =td_prediction(env, rand_pol, g,a, episodes, callback, mon, recorder)
+        res ={'policy': rand_pol.tolist(), 'values':v.tolist(), 'history': h}
 
     elif algo_name =='n_step_td':
-        rand_pol= np.random.randint(0, env.n_actions, size=env.n_states)
-        v,h =n_step_td(env, rand_pol, n_steps, g, a,episodes)
-        return {'policy': rand_pol.tolist(), 'values': v.tolist(), 'history':h}
+        rand_pol= rng.integers(0, env.n_actions, size=env.n_states)
+        v,h =n_step_td(env, rand_pol, n_steps, g, a,episodes, callback, mon, recorder)
+        res ={'policy': rand_pol.tolist(), 'values': v.tolist(), 'history':h}
 
     elif algo_name=='sarsa':
-        p, q, h=sarsa(env, g, a, eps, episodes)
+        p, q, h=sarsa(env, g, a, eps, episodes, callback, rng, sel, mon, recorder)
+        v =np.max(q, axis=1)
+        res ={'policy': p.tolist(), 'values': v.tolist(),'history': h, 'q_values': q.tolist()}
+
+    elif algo_name =='expected_sarsa':
+        p, q, h =expected_sarsa(env, g, a, eps, episodes, callback, rng, sel, mon, recorder)
+        v= np.max(q, axis=1)
+        res ={'policy': p.tolist(), 'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
+
+    elif algo_name== 'double_q_learning':
+        p, q,h =double_q_learning(env, g, a, eps, episodes, callback, rng, sel, mon, recorder)
         v =np.max(q, axis=1)
-        return {'policy': p.tolist(), 'values': v.tolist(),'history': h, 'q_values': q.tolist()}
+        res= {'policy': p.tolist(), 'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
 
     elif algo_name =='q_learning':
-        p, q,h =q_learning(env, g, a,eps, episodes)
+        p, q,h =q_learning(env, g, a,eps, episodes, callback, rng, sel, mon, rep,
+                            params.get('batch_size', 32), params.get('replay_ratio', 1.0), recorder)
         v= np.max(q, axis=1)
-        return {'policy':p.tolist(), 'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
+        res ={'policy':p.tolist(), 'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
+
+    elif algo_name== 'hogwild_q_learning':
+        p, q, h, stats =hogwild_q_learning(env, g, a, eps, episodes, callback, rng, params,
+                                           params.get('n_workers'), params.get('sync_every', 0), recorder)
+        v =np.max(q, axis=1)
+        res= {'policy': p.tolist(), 'values': v.tolist(), 'history': h, 'q_values': q.tolist()}
+        res.update(stats)
 
     else:
         return {'error': 'Unknown algorithm'}
+
+    if mon is not None:
+        res['converged'] =mon.stopped_at is not None
+        res['stopped_at']= mon.stopped_at if mon.stopped_at is not None else len(h)
+
+    return res
@@ -1,17 +1,95 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import numpy as np
 import json
+import os
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
-from environments import get_environment,GridWorld, FrozenLake, CliffWalking, MountainCar,CartPole
-from algorithms import run_algorithm
+from environments import get_environment,GridWorld, FrozenLake, CliffWalking, MountainCar,CartPole, WALL, HOLE, HAZARD
+from tiles import TileStore
+from jobs import train_job
+from multiseed import run_seeds
+from rollouts import RolloutCache, policy_key, private_copy
 
 app= Flask(__name__)
 
+# one shared environment; env_lock serializes everything that steps or swaps
+# it so a threaded server can't interleave two clients' moves
 curr_env =None
 curr_st= None
+curr_spec =None
+env_lock= threading.RLock()
+
+# capped so /api/get_logs stays cheap however long the server runs
+event_log= deque(maxlen=1000)
+log_lock =threading.Lock()
+
+# trained models kept server-side so large tables can be served as tiles
+models =OrderedDict()
+models_lock= threading.Lock()
+model_ids =itertools.count(1)
+MAX_MODELS= 8
+# above this many states /api/train leaves the full tables out of the response
+LARGE_STATES =4096
+# big layouts send a downsampled wall mask at most this many cells across (the canvas is 400px)
+WALL_TILE_CELLS= 200
+
+# replays of deterministic (env, policy) pairs are served from here
+rollout_cache =RolloutCache(32)
+MAX_ROLLOUT_STEPS= 10000
+
+# training runs in a process pool so request threads (and the GIL) stay free;
+# at most MAX_PENDING_TRAIN jobs may be queued or running, beyond that -> 503
+TRAIN_WORKERS= int(os.environ.get('RL_TRAIN_WORKERS', max(1, (os.cpu_count() or 2)- 1)))
+MAX_PENDING_TRAIN =int(os.environ.get('RL_MAX_PENDING_TRAIN', 2* TRAIN_WORKERS))
+train_slots= threading.BoundedSemaphore(MAX_PENDING_TRAIN)
+# a multi-seed run is n_seeds jobs, so it takes n_seeds slots (times the
+# worker count for hogwild)
+MAX_SEEDS =16
+_pool =None
+_pool_lock= threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: forking a threaded server can deadlock the child
+            _pool= ProcessPoolExecutor(max_workers=TRAIN_WORKERS,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def drop_pool(pool):
+    # a crashed worker leaves the executor unusable; start fresh next time
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool =None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def acquire_slots(n):
+    # all-or-nothing, without blocking; False if the queue can't take n more jobs
+    got =0
+    while got< n and train_slots.acquire(blocking=False):
+        got +=1
+    if got< n:
+        for _ in range(got):
+            train_slots.release()
+        return False
+    return True
+
+
+def release_slots(n):
+    for _ in range(n):
+        train_slots.release()
 
-event_log= []
 
 def add_log(event_typ, details):
     ts =datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
@@ -20,7 +98,13 @@ def add_log(event_typ, details):
         'type': event_typ,
         'details':details
     }
-    event_log.append(entry)
+    with log_lock:
+        event_log.append(entry)
+
+
+def get_model(mid):
+    with models_lock:
+        return models.get(str(mid))
 
 
 @app.route('/')
@@ -30,7 +114,7 @@ def index():
 
 @app.route('/api/init_env', methods=['POST'])
 def init_env():
-    global curr_env, curr_st
+    global curr_env, curr_st, curr_spec
 
     try:
         data= request.json
@@ -39,34 +123,50 @@ def init_env():
 
         add_log('INIT_ENV', {'environment': env_name,'params': params})
 
-        curr_env =get_environment(env_name, **params)
-        curr_st= curr_env.reset()
+        # build outside the lock, then swap it in
+        env =get_environment(env_name, **params)
+        st= env.reset()
+        with env_lock:
+            curr_env =env
+            curr_st= st
+            curr_spec =(env_name, params)
 
         info ={
-            'n_states': curr_env.n_states,
-            'n_actions': curr_env.n_actions,
-            'actions': curr_env.moves if hasattr(curr_env, 'moves') else curr_env.actions,
-            'state': list(curr_st) if isinstance(curr_st, tuple) else curr_st
+            'n_states': env.n_states,
+            'n_actions': env.n_actions,
+            'actions': env.moves if hasattr(env, 'moves') else env.actions,
+            'state': list(st) if isinstance(st, tuple) else st
         }
 
         # check frozenlake first (has both sz and hole_locs)
-        if hasattr(curr_env, 'hole_locs'):
-            info['holes']= curr_env.hole_locs
-            info['goal']= curr_env.goal_loc
-            info['grid_size']= curr_env.sz
-        elif hasattr(curr_env, 'sz'):
-            info['grid_size']= curr_env.sz
-            info['goal'] =curr_env.target
-            if hasattr(curr_env, 'blocks'):
-                info['obstacles']= curr_env.blocks
-        elif hasattr(curr_env, 'h'):
-            info['grid_height']= curr_env.h
-            info['grid_width'] =curr_env.w
-            if hasattr(curr_env, 'danger_zone'):
-                info['cliff'] =curr_env.danger_zone
-            info['goal'] =curr_env.end_pos
-
-        add_log('INIT_SUCCESS', {'n_states': curr_env.n_states, 'n_actions': curr_env.n_actions})
+        if hasattr(env, 'hole_locs'):
+            info['holes']= env.hole_locs
+            info['goal']= env.goal_loc
+            info['grid_size']= env.sz
+        elif hasattr(env, 'sz'):
+            info['grid_size']= env.sz
+            info['goal'] =env.target
+            # big generated layouts get a pooled wall mask (wall fraction per block)
+            # instead of an obstacle list
+            if hasattr(env, 'blocks') and env.n_states<= LARGE_STATES:
+                info['obstacles']= env.blocks
+                # hole ('H') and hazard ('C') cells from a map file
+                for key, code in (('holes', HOLE), ('hazards', HAZARD)):
+                    marked =np.argwhere(env.cells== code)
+                    if len(marked):
+                        info[key]= marked.tolist()
+            elif hasattr(env, 'cells'):
+                walls =TileStore((env.cells== WALL).ravel(), np.zeros(env.n_states, dtype=int), (env.sz, env.sz), 1)
+                info['wall_tile']= walls.tile(walls.fit_zoom(WALL_TILE_CELLS))
+                info['wall_tile']['policy'] =None
+        elif hasattr(env, 'h'):
+            info['grid_height']= env.h
+            info['grid_width'] =env.w
+            if hasattr(env, 'danger_zone'):
+                info['cliff'] =env.danger_zone
+            info['goal'] =env.end_pos
+
+        add_log('INIT_SUCCESS', {'n_states': env.n_states, 'n_actions': env.n_actions})
 
         return jsonify(info)
 
@@ -83,14 +183,15 @@ def init_env():
 def step():
     global curr_env, curr_st
 
-    if curr_env is None:
-        return jsonify({'error': 'Environment not initialized'})
-
     data =request.json
     act =data.get('action', 0)
 
-    nxt_st, rew, finished =curr_env.step(act)
-    curr_st =nxt_st
+    with env_lock:
+        if curr_env is None:
+            return jsonify({'error': 'Environment not initialized'})
+
+        nxt_st, rew, finished =curr_env.step(act)
+        curr_st =nxt_st
 
     add_log('MANUAL_STEP', {
         'action': int(act),
@@ -110,34 +211,96 @@ def step():
 def reset():
     global curr_env, curr_st
 
-    if curr_env is None:
-        return jsonify({'error': 'Environment not initialized'})
+    with env_lock:
+        if curr_env is None:
+            return jsonify({'error': 'Environment not initialized'})
 
-    curr_st =curr_env.reset()
+        st =curr_env.reset()
+        curr_st= st
 
     add_log('RESET_ENV', {
-        'state': list(curr_st) if isinstance(curr_st, tuple) else str(curr_st)
+        'state': list(st) if isinstance(st, tuple) else str(st)
     })
 
     return jsonify({
-        'state': list(curr_st) if isinstance(curr_st, tuple) else curr_st
+        'state': list(st) if isinstance(st, tuple) else st
     })
 
 
 @app.route('/api/train', methods=['POST'])
 def train():
-    global curr_env
-
-    if curr_env is None:
+    with env_lock:
+        spec =curr_spec
+    if spec is None:
         return jsonify({'error': 'Environment not initialized'})
 
     data= request.json
     algo =data.get('algorithm', 'q_learning')
     params= data.get('params', {})
 
+    n_seeds =min(max(1, int(params.get('n_seeds', 1))), MAX_SEEDS)
+    params['n_seeds']= n_seeds
+    slots =n_seeds
+    if algo== 'hogwild_q_learning':
+        # its workers are extra processes outside the pool: cap them at the
+        # pool size and charge a slot for each
+        n_workers =min(max(1, int(params.get('n_workers') or TRAIN_WORKERS)), TRAIN_WORKERS)
+        params['n_workers']= n_workers
+        slots *=n_workers
+    if slots> MAX_PENDING_TRAIN:
+        return jsonify({'error': 'this run needs %d training slots, the server has %d' % (slots, MAX_PENDING_TRAIN)}), 400
+
+    # backpressure: refuse rather than queue without bound
+    if not acquire_slots(slots):
+        add_log('TRAIN_REJECTED', {'algorithm': algo, 'reason': 'training queue full'})
+        resp =jsonify({'error': 'Training queue is full, try again shortly'})
+        resp.status_code= 503
+        resp.headers['Retry-After'] ='5'
+        return resp
+
     add_log('TRAIN_START', {'algorithm': algo,'params': params})
 
-    result= run_algorithm(curr_env, algo, params)
+    # about 100 snapshots per run unless the client asks otherwise
+    dp =algo in ('policy_iteration', 'modified_policy_iteration', 'value_iteration')
+    snap_every= 1 if dp else max(1, int(params.get('n_episodes', 500))// 100)
+
+    pool =get_pool()
+    try:
+        if n_seeds> 1:
+            # seeds fan out across the pool; curves come back aggregated
+            summary =run_seeds(spec[0], spec[1], algo, params, n_seeds, executor=pool)
+            job= {'result': summary, 'snapshots': None, 'dims': summary.pop('dims', None),
+                  'n_actions': summary.pop('n_actions', None), 'n_states': summary.pop('n_states', 0)}
+        else:
+            job= pool.submit(train_job, spec[0], spec[1], algo, params, snap_every).result()
+    except BrokenProcessPool:
+        drop_pool(pool)
+        add_log('TRAIN_FAILED', {'algorithm': algo, 'reason': 'worker process died'})
+        return jsonify({'error': 'Training worker crashed'}), 500
+    finally:
+        release_slots(slots)
+
+    result= job['result']
+
+    if 'error' not in result:
+        mid =str(next(model_ids))
+        entry= {
+            'tiles': TileStore(result['values'], result['policy'], job['dims'], job['n_actions']),
+            'policy': result['policy'],
+            'snapshots': job['snapshots'],
+            'dims': job['dims'],
+            'n_actions': job['n_actions'],
+        }
+        with models_lock:
+            models[mid] =entry
+            while len(models)> MAX_MODELS:
+                models.popitem(last=False)
+        result['model_id'] =mid
+
+        if job['n_states']> LARGE_STATES:
+            for key in ('values', 'policy', 'q_values', 'best_policy'):
+                result.pop(key, None)
+            result['tiled']= True
 
     add_log('TRAIN_COMPLETE', {
         'algorithm': algo,
@@ -152,40 +315,45 @@ def train():
 def run_episode():
     global curr_env
 
-    if curr_env is None:
-        return jsonify({'error': 'Environment not initialized'})
-
     data =request.json
     pol= data.get('policy', None)
+    if pol is None and data.get('model_id') is not None:
+        model =get_model(data['model_id'])
+        if model is not None:
+            pol= model['policy']
 
     if pol is None:
         return jsonify({'error': 'No policy provided'})
 
     add_log('RUN_EPISODE_START', {})
 
-    st =curr_env.reset()
     path =[]
     tot_rew =0
     finished= False
     max_st= 200
 
     step_cnt =0
-    while not finished and step_cnt< max_st:
-        s_idx= curr_env.state_to_idx(st)
-        act= pol[s_idx]
+    with env_lock:
+        if curr_env is None:
+            return jsonify({'error': 'Environment not initialized'})
 
-        nxt_st, rew, finished =curr_env.step(act)
+        st =curr_env.reset()
+        while not finished and step_cnt< max_st:
+            s_idx= curr_env.state_to_idx(st)
+            act= pol[s_idx]
+
+            nxt_st, rew, finished =curr_env.step(act)
 
-        path.append({
-            'state': list(nxt_st) if isinstance(nxt_st, tuple) else nxt_st,
-            'action': int(act),
-            'reward': float(rew),
-            'done': bool(finished)
-        })
+            path.append({
+                'state': list(nxt_st) if isinstance(nxt_st, tuple) else nxt_st,
+                'action': int(act),
+                'reward': float(rew),
+                'done': bool(finished)
+            })
 
-        tot_rew +=rew
-        st= nxt_st
-        step_cnt +=1
+            tot_rew +=rew
+            st= nxt_st
+            step_cnt +=1
 
     add_log('RUN_EPISODE_COMPLETE', {
         'steps': step_cnt,
@@ -199,10 +367,122 @@ def run_episode():
     })
 
 
+@app.route('/api/rollout', methods=['POST'])
+def rollout():
+    # like run_episode, but frames go out as ndjson while the episode runs
+    data =request.json
+    pol= data.get('policy', None)
+    if pol is None and data.get('model_id') is not None:
+        model =get_model(data['model_id'])
+        if model is not None:
+            pol= model['policy']
+
+    if pol is None:
+        return jsonify({'error': 'No policy provided'})
+
+    with env_lock:
+        if curr_env is None:
+            return jsonify({'error': 'Environment not initialized'})
+        env_ref =curr_env
+        spec= curr_spec
+
+    pol =np.asarray(pol, dtype=np.int64)
+    max_st= max(1, min(int(data.get('max_steps', 200)), MAX_ROLLOUT_STEPS))
+    key =policy_key(spec, pol, max_st) if getattr(env_ref, 'deterministic', False) else None
+
+    # cache hits never touch the env at all
+    cached= rollout_cache.get(key) if key is not None else None
+    add_log('ROLLOUT_START', {'max_steps': max_st, 'cacheable': key is not None, 'cached': cached is not None})
+    if cached is not None:
+        return Response(rollout_cache.replay(cached), mimetype='application/x-ndjson')
+
+    with env_lock:
+        # cheap private copy so a slow stream never holds the shared env
+        env =private_copy(env_ref)
+    if key is None:
+        # fresh stream, otherwise every copy would replay the same episode
+        env.seed()
+
+    return Response(stream_with_context(rollout_cache.stream(key, env, pol, max_st)),
+                    mimetype='application/x-ndjson')
+
+
+@app.route('/api/tiles', methods=['POST'])
+def tiles():
+    data =request.json
+    model= get_model(data.get('model_id'))
+    if model is None:
+        return jsonify({'error': 'Unknown model'}), 404
+
+    store =model['tiles']
+    axes= data.get('axes')
+    mode =data.get('mode', 'mean')
+    if mode not in ('mean', 'max'):
+        return jsonify({'error': 'mode must be mean or max'}), 400
+
+    if axes is not None:
+        n_dims =len(store.dims)
+        if (not isinstance(axes, list) or len(axes)!= 2 or not all(isinstance(x, int) for x in axes)
+                or not all(0<= x< n_dims for x in axes) or axes[0]== axes[1]):
+            return jsonify({'error': 'axes must be two different dimensions in 0..%d' % (n_dims- 1)}), 400
+
+    try:
+        max_cells =int(data.get('max_cells', 100))
+        zoom= data.get('zoom')
+        zoom =store.fit_zoom(max(1, max_cells), axes) if zoom is None else int(zoom)
+        window= [int(data.get(k, 0)) for k in ('x0', 'y0')]+ [None if data.get(k) is None else int(data[k])
+                                                                for k in ('w', 'h')]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'zoom, max_cells, x0, y0, w and h must be integers'}), 400
+    # past the level where the whole table is one cell, zooming out only pads
+    max_zoom =store.fit_zoom(1, axes)
+    if not 0<= zoom<= max_zoom:
+        return jsonify({'error': 'zoom must be between 0 and %d' % max_zoom}), 400
+
+    tile= store.tile(zoom, *window, mode, axes)
+    return jsonify(tile)
+
+
+@app.route('/api/snapshot', methods=['POST'])
+def snapshot():
+    data =request.json
+    model= get_model(data.get('model_id'))
+    if model is None or model['snapshots'] is None:
+        return jsonify({'error': 'No snapshots for this model'}), 404
+
+    rec =model['snapshots']
+    if data.get('step') is None:
+        return jsonify({'steps': rec.steps, 'nbytes': rec.nbytes()})
+
+    step, arrays= rec.state_at(int(data['step']))
+    if 'q' in arrays:
+        vals =arrays['q'].max(axis=1)
+        pol= arrays['q'].argmax(axis=1)
+    else:
+        vals =arrays['v']
+        pol= arrays.get('policy')
+
+    out ={'step': step}
+    if len(vals)> LARGE_STATES or len(model['dims'])> 2:
+        # same tiling as the final model so big tables never cross the wire
+        store =TileStore(vals, pol if pol is not None else np.zeros(len(vals), dtype=int),
+                         model['dims'], model['n_actions'])
+        out['tile']= store.tile(store.fit_zoom(max(1, int(data.get('max_cells', 100)))))
+        if pol is None:
+            out['tile']['policy'] =None
+    else:
+        out['values']= vals.tolist()
+        out['policy'] =pol.tolist() if pol is not None else None
+    return jsonify(out)
+
+
 @app.route('/api/get_logs', methods=['GET'])
 def get_logs():
-    return jsonify({'logs': event_log})
+    with log_lock:
+        logs =list(event_log)
+    return jsonify({'logs': logs})
 
 
 if __name__== '__main__':
-    app.run(debug=True, port=5000)
+    # threaded so polling and manual control keep working during training
+    app.run(debug=True, port=5000, threaded=True)
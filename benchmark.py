@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from environments import get_environment
+from algorithms import run_algorithm
+from gridgen import KINDS
+
+
+class StepCounter:
+    # wraps an env and counts step() calls; everything else passes through
+    def __init__(self, env):
+        self.env =env
+        self.steps= 0
+
+    def step(self, action):
+        self.steps +=1
+        return self.env.step(action)
+
+    def __getattr__(self, name):
+        # 'env' itself is missing only mid-unpickle (hogwild workers); don't recurse
+        if name== 'env':
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+
+def bench_one(kind, size, algo, params, layout_seed=0, slip=0.0):
+    t0 =time.perf_counter()
+    env= get_environment('gridworld', generate=kind, size=size, layout_seed=layout_seed, slip=slip)
+    build =time.perf_counter()- t0
+
+    counted= StepCounter(env)
+    t0 =time.perf_counter()
+    res= run_algorithm(counted, algo, params)
+    solve =time.perf_counter()- t0
+    if 'error' in res:
+        raise ValueError(res['error'])
+
+    # model-free learners report env steps, dp solvers their sweeps (and backups if counted)
+    steps =res.get('env_steps', counted.steps)
+    h= res['history']
+    row ={
+        'kind': kind,
+        'size': size,
+        'n_states': env.n_states,
+        'algorithm': algo,
+        'layout_seed': layout_seed,
+        'slip': slip,
+        'build_seconds': round(build, 4),
+        'solve_seconds': round(solve, 4),
+        'iterations': len(h),
+    }
+    if steps:
+        row['env_steps']= steps
+        row['steps_per_sec'] =round(steps/ solve, 1) if solve> 0 else None
+        tail= h[-max(1, len(h)// 10):]
+        row['final_return'] =float(np.mean(tail))
+    if 'backups' in res:
+        row['backups']= res['backups']
+    elif algo== 'value_iteration':
+        # every sweep backs up every state-action pair
+        row['backups'] =len(h)* env.n_states* env.n_actions
+    return row
+
+
+def build_parser():
+    ap =argparse.ArgumentParser(description='scaling benchmark on generated gridworlds')
+    ap.add_argument('--kinds', nargs='+', default=['maze', 'rooms', 'random'], choices=KINDS)
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10, 20, 40])
+    ap.add_argument('--algos', nargs='+', default=['value_iteration', 'q_learning'])
+    ap.add_argument('--episodes', type=int, default=200)
+    ap.add_argument('--layout-seed', type=int, default=0)
+    ap.add_argument('--slip', type=float, default=0.0)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--params', default='{}', help='extra json params for every algorithm')
+    ap.add_argument('--out', default='bench_results.jsonl', help='results are appended, one json line per run')
+    return ap
+
+
+def main(argv=None):
+    args= build_parser().parse_args(argv)
+    params ={'n_episodes': args.episodes, 'seed': args.seed}
+    params.update(json.loads(args.params))
+
+    stamp= datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print('%-7s %5s %8s %-26s %9s %9s %12s %10s' % ('kind', 'size', 'states', 'algorithm', 'build s',
+                                                      'solve s', 'steps/s', 'backups'))
+    with open(args.out, 'a') as f:
+        for kind in args.kinds:
+            for size in args.sizes:
+                for algo in args.algos:
+                    row =bench_one(kind, size, algo, dict(params), args.layout_seed, args.slip)
+                    row['run_at']= stamp
+                    f.write(json.dumps(row)+ '\n')
+                    f.flush()
+                    print('%-7s %5d %8d %-26s %9.3f %9.3f %12s %10s' % (
+                        kind, size, row['n_states'], algo, row['build_seconds'], row['solve_seconds'],
+                        row.get('steps_per_sec', '-'), row.get('backups', '-')))
+
+    print('results appended to %s' % os.path.abspath(args.out))
+    return 0
+
+
+if __name__ =='__main__':
+    sys.exit(main())
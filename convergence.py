@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class ConvergenceMonitor:
+    # early stopping for the model-free learners. learners report each table
+    # update and the return of each episode; every `window` episodes the
+    # monitor checks whether the greedy policy changed and the moving average
+    # return moved less than `return_tol`, relative to the larger of its size
+    # and the spread of returns in the window. `tol` optionally also bounds the
+    # largest update, relative to the largest |q| seen; constant exploration
+    # keeps single updates noisy, so it is off by default. value-only learners
+    # (td, n-step td) follow a fixed policy, so for them the test is instead
+    # the largest net change of any V over the window, relative to the largest
+    # |V| seen, under `value_tol`. after `patience` stable windows it stops.
+    def __init__(self, window=20, patience=3, tol=None, return_tol=0.1, min_episodes=0, value_tol=0.05):
+        self.window =max(1, window)
+        self.patience= max(1, patience)
+        self.tol =tol
+        self.return_tol= return_tol
+        self.min_episodes =min_episodes
+        self.value_tol= value_tol
+
+        self.greedy= None
+        self.policy_changes =0
+        self.max_delta= 0.0
+        self.q_scale =1.0
+        self.v_net= {}
+        self.v_scale =1.0
+        self.returns =[]
+        self.prev_avg= None
+        self.stable_windows =0
+        self.stopped_at= None
+        self.history =[]
+
+    def update(self, sid, row, delta, value=None):
+        d =abs(delta)
+        if d> self.max_delta:
+            self.max_delta =d
+
+        if row is None:
+            self.v_net[sid] =self.v_net.get(sid, 0.0)+ delta
+            if value is not None and abs(value)> self.v_scale:
+                self.v_scale =abs(value)
+            return
+        if self.tol is not None:
+            m =float(np.abs(row).max())
+            if m> self.q_scale:
+                self.q_scale =m
+        if self.greedy is None:
+            self.greedy =np.zeros(0, dtype=np.int64)
+        if sid>= len(self.greedy):
+            # grow lazily so the monitor doesn't need to know the table size
+            grown= np.full(max(sid+ 1, 2* len(self.greedy)), -1, dtype=np.int64)
+            grown[:len(self.greedy)] =self.greedy
+            self.greedy= grown
+
+        # only the updated row can change its argmax
+        a =int(np.argmax(row))
+        if a!= self.greedy[sid]:
+            if self.greedy[sid]>= 0:
+                self.policy_changes +=1
+            self.greedy[sid]= a
+
+    def end_episode(self, ep, ret):
+        self.returns.append(float(ret))
+        if (ep+ 1)% self.window:
+            return False
+
+        avg =float(np.mean(self.returns[-self.window:]))
+        max_dv =max(abs(v) for v in self.v_net.values()) if self.v_net else None
+        stable= self.policy_changes ==0
+        if max_dv is not None:
+            # value-only: the return of a fixed policy says nothing about learning
+            stable =max_dv< self.value_tol* self.v_scale
+        else:
+            if stable and self.tol is not None:
+                stable =self.max_delta< self.tol* self.q_scale
+            if stable and self.return_tol is not None:
+                # noisy returns (slippery or stochastic envs) widen the allowed drift
+                scale =max(abs(self.prev_avg or 0.0), float(np.std(self.returns[-self.window:])), 1e-8)
+                stable= self.prev_avg is not None and abs(avg- self.prev_avg)/ scale< self.return_tol
+
+        self.history.append({'episode': ep, 'policy_changes': self.policy_changes,
+                             'max_delta': self.max_delta, 'avg_return': avg, 'max_dv': max_dv})
+        self.stable_windows =self.stable_windows+ 1 if stable else 0
+        self.prev_avg= avg
+        self.policy_changes =0
+        self.max_delta= 0.0
+        self.v_net ={}
+
+        if self.stable_windows>= self.patience and ep+ 1>= self.min_episodes:
+            self.stopped_at =ep+ 1
+            return True
+        return False
+
+
+def monitor_from_params(params):
+    if not params.get('early_stop', False):
+        return None
+    return ConvergenceMonitor(
+        window=params.get('stop_window', 20),
+        patience=params.get('patience', 3),
+        tol=params.get('tolerance'),
+        return_tol=params.get('return_tol', 0.1),
+        min_episodes=params.get('min_episodes', 0),
+        value_tol=params.get('value_tolerance', 0.05),
+    )
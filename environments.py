@@ -2,44 +2,154 @@ import numpy as np
 import random
 import gymnasium as gym
 
+from seeding import make_rng
+
+
+# cell codes for the precomputed grid masks
+FREE =0
+WALL= 1
+GOAL =2
+HAZARD= 3
+HOLE =4
+# start cells in generated layouts; they behave like FREE
+START= 5
+
+MAP_CHARS ={'.': FREE, ' ': FREE, 'S': FREE, '#': WALL, 'G': GOAL, 'C': HAZARD, 'H': HOLE}
+
+
+def build_next_idx(cells):
+    # next_idx[s, a] for up/down/left/right on a (rows, cols) grid; moves off
+    # the edge or into a wall leave the agent where it is
+    n_r, n_c =cells.shape
+    rr, cc= np.divmod(np.arange(n_r* n_c), n_c)
+    moves =[(np.maximum(rr- 1, 0), cc), (np.minimum(rr+ 1, n_r- 1), cc),
+            (rr, np.maximum(cc- 1, 0)), (rr, np.minimum(cc+ 1, n_c- 1))]
+
+    flat= cells.ravel()
+    here =np.arange(n_r* n_c)
+    nxt= np.empty((n_r* n_c, 4), dtype=np.int64)
+    for a, (nr, nc) in enumerate(moves):
+        n =nr* n_c+ nc
+        nxt[:, a]= np.where(flat[n]== WALL, here, n)
+    return nxt
+
+
+def load_grid_map(path):
+    # text maps use MAP_CHARS ('#' wall, 'G' goal, 'S' start, '.' free);
+    # .npy files hold a uint8 array of cell codes. returns (cells, start)
+    if str(path).endswith('.npy'):
+        cells =np.load(path).astype(np.uint8)
+        return cells, None
+
+    with open(path) as f:
+        lines= [ln.rstrip('\n') for ln in f if ln.strip()]
+    width =max(len(ln) for ln in lines)
+    cells= np.zeros((len(lines), width), dtype=np.uint8)
+    start =None
+    for r, ln in enumerate(lines):
+        for c, ch in enumerate(ln):
+            if ch not in MAP_CHARS:
+                raise ValueError('unknown map character %r at line %d' % (ch, r+ 1))
+            cells[r, c] =MAP_CHARS[ch]
+            if ch== 'S':
+                start =(r, c)
+    return cells, start
+
 
 class GridWorld:
-    def __init__(self, size=5, goal=(4,4), obstacles=[]):
+    def __init__(self, size=5, goal=None, obstacles=None, start=(0,0), layout=None, slip=0.0):
+        # goal defaults to the bottom-right corner, or the 'G' cell of a layout
+        starts =[tuple(start)]
+        if layout is not None:
+            # non-square layouts are padded with walls so the grid stays size x size
+            layout =np.asarray(layout, dtype=np.uint8)
+            size= max(layout.shape)
+            cells =np.full((size, size), WALL, dtype=np.uint8)
+            cells[:layout.shape[0], :layout.shape[1]]= layout
+            goals =np.argwhere(cells== GOAL)
+            if len(goals):
+                goal= tuple(int(x) for x in goals[0])
+            elif goal is None:
+                raise ValueError("layout has no goal cell ('G') and no goal was given")
+            marked =np.argwhere(cells== START)
+            if len(marked):
+                starts= [(int(r), int(c)) for r, c in marked]
+                cells[cells== START] =FREE
+        else:
+            cells =np.zeros((size, size), dtype=np.uint8)
+            for r, c in (obstacles or []):
+                cells[r, c]= WALL
+            if goal is None:
+                goal= (size- 1, size- 1)
+
+        goal =tuple(int(x) for x in goal)
+        for name, (r, c) in [('goal', goal)]+ [('start', p) for p in starts]:
+            if not (0<= r< size and 0<= c< size):
+                raise ValueError('%s %s is outside the %dx%d grid' % (name, (r, c), size, size))
+            if cells[r, c]== WALL:
+                raise ValueError('%s %s is on a wall' % (name, (r, c)))
+            if name =='start' and cells[r, c] in (HAZARD, HOLE):
+                raise ValueError('start %s is on a hazard or hole' % ((r, c),))
+
         self.sz =size
         self.target= goal
-        self.blocks =obstacles
-        self.curr_pos =(0,0)
+        self.starts =starts
+        self.start= starts[0]
+        # with probability slip the move is replaced by a uniformly random one
+        self.slip =float(slip)
+        cells[self.target] =GOAL
+        self.cells= cells
+        self.cell_flat =cells.ravel()
+        self.next_idx= build_next_idx(cells)
+        self.blocks =[(int(r), int(c)) for r, c in np.argwhere(cells== WALL)]
+        self.curr_pos= self.start
         self.moves =['up', 'down', 'left', 'right']
         self.n_actions= 4
         self.n_states =size*size
+        self.rng= make_rng()
+        self.deterministic =self.slip== 0 and len(self.starts)== 1
 
-    def reset(self):
-        self.curr_pos =(0, 0)
-        return self.curr_pos
+    @classmethod
+    def from_map(cls, path, **kwargs):
+        cells, start =load_grid_map(path)
+        if start is not None:
+            kwargs.setdefault('start', start)
+        return cls(layout=cells, **kwargs)
 
-    def step(self, action):
-        r,c =self.curr_pos
+    @classmethod
+    def generate(cls, kind, size=50, layout_seed=0, slip=0.0, **opts):
+        # procedural maze/rooms/random layout, cached on disk (see gridgen)
+        from gridgen import cached_layout
+        return cls(layout=cached_layout(kind, size, layout_seed, **opts), slip=slip)
 
-        if action ==0:
-            r= max(0, r-1)
-        elif action== 1:
-            r =min(self.sz-1, r+1)
-        elif action ==2:
-            c =max(0, c-1)
-        elif action== 3:
-            c= min(self.sz-1, c+1)
+    def seed(self, seed=None):
+        self.rng =make_rng(seed)
 
-        nxt =(r,c)
-
-        if nxt in self.blocks:
-            nxt =self.curr_pos
-
-        self.curr_pos= nxt
+    def reset(self):
+        if len(self.starts)> 1:
+            self.curr_pos =self.starts[int(self.rng.integers(len(self.starts)))]
+        else:
+            self.curr_pos= self.start
+        return self.curr_pos
 
-        if self.curr_pos== self.target:
+    def step(self, action):
+        if self.slip> 0 and self.rng.random()< self.slip:
+            action =int(self.rng.integers(self.n_actions))
+        s =self.curr_pos[0]* self.sz+ self.curr_pos[1]
+        n= int(self.next_idx[s, action])
+        self.curr_pos =divmod(n, self.sz)
+
+        cell= self.cell_flat[n]
+        if cell== GOAL:
             return self.curr_pos, 10, True
-        elif self.curr_pos in self.blocks:
+        elif cell ==WALL:
             return self.curr_pos,-5, False
+        elif cell== HAZARD:
+            # map hazards ('C') work like the cliff: big penalty, back to a start
+            return self.reset(), -100, False
+        elif cell ==HOLE:
+            # map holes ('H') end the episode like in frozenlake
+            return self.curr_pos, -10, True
         else:
             return self.curr_pos, -1,False
 
@@ -57,32 +167,30 @@ class GridWorld:
         return (idx//self.sz, idx% self.sz)
 
     def get_transitions(self, state, action):
-        if state== self.target:
+        s =state[0]* self.sz+ state[1]
+        # walls can't be entered, so model them as absorbing like the goal;
+        # otherwise their self-loops (V -> -1/(1-gamma)) dominate dp convergence
+        if self.cell_flat[s] in (GOAL, WALL, HOLE):
             return [(state,1.0, 0, True)]
 
-        r, c= state
-
-        if action==0:
-            nr =max(0, r-1)
-            nc= c
-        elif action ==1:
-            nr= min(self.sz-1, r+1)
-            nc =c
-        elif action== 2:
-            nr= r
-            nc =max(0, c-1)
-        elif action ==3:
-            nr =r
-            nc= min(self.sz-1, c+1)
-
-        nxt_st= (nr, nc)
-        if nxt_st in self.blocks:
-            nxt_st =state
-
-        if nxt_st ==self.target:
-            return [(nxt_st, 1.0,10, True)]
+        if self.slip> 0:
+            return [o for a in range(self.n_actions)
+                    for o in self._outcome(s, a, (1.0- self.slip)* (a== action)+ self.slip/ self.n_actions)]
+        return self._outcome(s, action, 1.0)
+
+    def _outcome(self, s, action, prob):
+        # a list, since a hazard sends the agent to any of the start cells
+        n= int(self.next_idx[s, action])
+        nxt_st =divmod(n, self.sz)
+        cell= self.cell_flat[n]
+        if cell ==GOAL:
+            return [(nxt_st, prob, 10, True)]
+        elif cell== HAZARD:
+            return [(st, prob/ len(self.starts), -100, False) for st in self.starts]
+        elif cell ==HOLE:
+            return [(nxt_st, prob, -10, True)]
         else:
-            return [(nxt_st, 1.0, -1,False)]
+            return [(nxt_st, prob, -1, False)]
 
 
 class CliffWalking:
@@ -92,33 +200,36 @@ class CliffWalking:
         self.start_pos =(3, 0)
         self.end_pos =(3,11)
         self.danger_zone =[(3,i) for i in range(1, 11)]
+        self.cells= np.zeros((self.h, self.w), dtype=np.uint8)
+        self.cells[3, 1:11] =HAZARD
+        self.cells[self.end_pos]= GOAL
+        self.cell_flat =self.cells.ravel()
+        self.next_idx= build_next_idx(self.cells)
+        self.start_idx =self.start_pos[0]* self.w+ self.start_pos[1]
         self.curr =self.start_pos
         self.moves= ['up','down', 'left', 'right']
         self.n_actions =4
         self.n_states= self.h *self.w
+        self.rng =make_rng()
+        self.deterministic= True
+
+    def seed(self, seed=None):
+        self.rng= make_rng(seed)
 
     def reset(self):
         self.curr= self.start_pos
         return self.curr
 
     def step(self, action):
-        r, c= self.curr
-
-        if action== 0:
-            r= max(0, r-1)
-        elif action ==1:
-            r =min(self.h-1, r+1)
-        elif action==2:
-            c =max(0, c-1)
-        elif action== 3:
-            c= min(self.w-1, c+1)
+        n =int(self.next_idx[self.curr[0]* self.w+ self.curr[1], action])
+        cell= self.cell_flat[n]
 
-        self.curr =(r, c)
-
-        if self.curr in self.danger_zone:
+        if cell== HAZARD:
             self.curr= self.start_pos
             return self.curr, -100,False
-        elif self.curr ==self.end_pos:
+
+        self.curr =divmod(n, self.w)
+        if cell ==GOAL:
             return self.curr, 10, True
         else:
             return self.curr,-1, False
@@ -137,27 +248,19 @@ class CliffWalking:
         return (idx// self.w, idx %self.w)
 
     def get_transitions(self, state, action):
-        if state ==self.end_pos:
+        s =state[0]* self.w+ state[1]
+        if self.cell_flat[s] ==GOAL:
             return [(state, 1.0, 0,True)]
 
-        r,c =state
-        if action== 0:
-            r= max(0, r-1)
-        elif action ==1:
-            r= min(self.h-1, r+1)
-        elif action== 2:
-            c =max(0, c-1)
-        elif action ==3:
-            c= min(self.w-1, c+1)
-
-        nxt= (r,c)
+        n= int(self.next_idx[s, action])
+        cell =self.cell_flat[n]
 
-        if nxt in self.danger_zone:
+        if cell== HAZARD:
             return [(self.start_pos, 1.0, -100, False)]
-        elif nxt== self.end_pos:
-            return [(nxt, 1.0, 10,True)]
+        elif cell ==GOAL:
+            return [(divmod(n, self.w), 1.0, 10,True)]
         else:
-            return [(nxt, 1.0,-1, False)]
+            return [(divmod(n, self.w), 1.0,-1, False)]
 
 
 class FrozenLake:
@@ -175,11 +278,26 @@ class FrozenLake:
 
         self.hole_locs =[(1,1), (1,3), (2,3),(3,0)]
         self.goal_loc= (3,3)
+        self.cells =np.zeros((self.sz, self.sz), dtype=np.uint8)
+        for hl in self.hole_locs:
+            self.cells[hl]= HOLE
+        self.cells[self.goal_loc] =GOAL
+        self.cell_flat= self.cells.ravel()
+        self.next_idx =build_next_idx(self.cells)
 
         self.curr_st =(0,0)
+        self.rng= make_rng()
+        self.deterministic =not slippery
+        self._reset_seed =None
+
+    def seed(self, seed=None):
+        # gymnasium only takes an int seed, applied on the next reset
+        self.rng =make_rng(seed)
+        self._reset_seed= int(self.rng.integers(2**31- 1))
 
     def reset(self):
-        o, _= self.env.reset()
+        o, _= self.env.reset(seed=self._reset_seed)
+        self._reset_seed =None
         self.curr_st =self.idx_to_state(o)
         return self.curr_st
 
@@ -209,42 +327,33 @@ class FrozenLake:
         return [(r,c) for r in range(self.sz) for c in range(self.sz)]
 
     def get_transitions(self, state, action):
-        if state in self.hole_locs or state== self.goal_loc:
+        s =state[0]* self.sz+ state[1]
+        if self.cell_flat[s]!= FREE:
             return [(state, 1.0, 0, True)]
 
         trans_list =[]
         if self.slip:
             for a_idx in range(4):
                 prob= 0.7 if a_idx==action else 0.1
-                ns =self._do_move(state, a_idx)
-                if ns in self.hole_locs:
-                    trans_list.append((ns, prob, -10, True))
-                elif ns ==self.goal_loc:
-                    trans_list.append((ns, prob, 10,True))
-                else:
-                    trans_list.append((ns, prob, -1, False))
+                trans_list.append(self._outcome(s, a_idx, prob))
         else:
-            ns =self._do_move(state, action)
-            if ns in self.hole_locs:
-                return [(ns,1.0, -10, True)]
-            elif ns== self.goal_loc:
-                return [(ns, 1.0,10, True)]
-            else:
-                return [(ns, 1.0, -1,False)]
+            return [self._outcome(s, action, 1.0)]
 
         return trans_list
 
+    def _outcome(self, s, action, prob):
+        n =int(self.next_idx[s, action])
+        ns= divmod(n, self.sz)
+        cell =self.cell_flat[n]
+        if cell== HOLE:
+            return (ns, prob, -10, True)
+        elif cell ==GOAL:
+            return (ns, prob, 10,True)
+        else:
+            return (ns, prob, -1, False)
+
     def _do_move(self, state, action):
-        r, c= state
-        if action ==0:
-            r =max(0, r-1)
-        elif action== 1:
-            r= min(self.sz-1, r+1)
-        elif action ==2:
-            c= max(0, c-1)
-        elif action== 3:
-            c =min(self.sz-1, c+1)
-        return (r,c)
+        return divmod(int(self.next_idx[state[0]* self.sz+ state[1], action]), self.sz)
 
 
 class MountainCar:
@@ -262,9 +371,18 @@ class MountainCar:
         self.v_hi =0.07
 
         self.st =None
+        self.rng= make_rng()
+        # the start position is random, so rollouts differ
+        self.deterministic= False
+        self._reset_seed =None
+
+    def seed(self, seed=None):
+        self.rng =make_rng(seed)
+        self._reset_seed= int(self.rng.integers(2**31- 1))
 
     def reset(self):
-        obs, _ =self.env.reset()
+        obs, _ =self.env.reset(seed=self._reset_seed)
+        self._reset_seed =None
         self.st= self._to_discrete(obs)
         return self.st
 
@@ -315,9 +433,17 @@ class CartPole:
         self.moves =['move_left', 'move_right']
 
         self.st= None
+        self.rng =make_rng()
+        self.deterministic =False
+        self._reset_seed= None
+
+    def seed(self, seed=None):
+        self.rng= make_rng(seed)
+        self._reset_seed =int(self.rng.integers(2**31- 1))
 
     def reset(self):
-        obs, _= self.env.reset()
+        obs, _= self.env.reset(seed=self._reset_seed)
+        self._reset_seed= None
         self.st= self._to_bins(obs)
         return self.st
 
@@ -383,6 +509,10 @@ class CartPole:
 
 def get_environment(name, **kwargs):
     if name =='gridworld':
+        if 'map_file' in kwargs:
+            return GridWorld.from_map(kwargs.pop('map_file'), **kwargs)
+        if 'generate' in kwargs:
+            return GridWorld.generate(kwargs.pop('generate'), **kwargs)
         return GridWorld(**kwargs)
     elif name== 'frozenlake':
         return FrozenLake(**kwargs)
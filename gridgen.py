@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from environments import FREE, WALL, GOAL, START, build_next_idx
+from seeding import make_rng, UniformBlock
+
+
+# procedural gridworld layouts for benchmarking. a layout is one uint8 array of
+# cell codes (START and GOAL cells included), cached on disk as .npy
+
+KINDS =['maze', 'rooms', 'random']
+# options each kind understands, on top of the start/goal ones
+KIND_OPTIONS ={'maze': (), 'rooms': ('room_size',), 'random': ('density',)}
+PLACE_OPTIONS= ('n_starts', 'n_goals', 'starts', 'goals')
+MIN_SIZE= 10
+MAX_SIZE =1000
+# bump when a generator changes so stale cache files are not reused
+GEN_VERSION= 1
+
+CACHE_DIR =os.environ.get('RL_GRID_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'rl_tool', 'grids'))
+
+
+def maze(size, rng):
+    # randomized depth-first carving on the odd cells; always fully connected
+    cells =np.full((size, size), WALL, dtype=np.uint8)
+    m= (size- 1)// 2
+    draws =UniformBlock(rng)
+    seen= np.zeros((m, m), dtype=bool)
+    seen[0, 0] =True
+    cells[1, 1]= FREE
+    stack =[(0, 0)]
+    steps= ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+    while stack:
+        r, c =stack[-1]
+        nbrs= [(r+ dr, c+ dc) for dr, dc in steps
+                if 0<= r+ dr< m and 0<= c+ dc< m and not seen[r+ dr, c+ dc]]
+        if not nbrs:
+            stack.pop()
+            continue
+        nr, nc =nbrs[draws.integer(len(nbrs))]
+        seen[nr, nc]= True
+        # open the cell and the wall between
+        cells[2* nr+ 1, 2* nc+ 1] =FREE
+        cells[r+ nr+ 1, c+ nc+ 1]= FREE
+        stack.append((nr, nc))
+    return cells
+
+
+def rooms(size, rng, room_size=None):
+    # a grid of rooms, one door in every wall segment between neighbours
+    room_size =room_size or max(4, size// 8)
+    cells= np.zeros((size, size), dtype=np.uint8)
+    lines =np.arange(room_size, size- 1, room_size+ 1)
+    cells[lines, :]= WALL
+    cells[:, lines] =WALL
+
+    edges= np.concatenate([[-1], lines, [size]])
+    for i in range(len(edges)- 1):
+        lo, hi =edges[i]+ 1, edges[i+ 1]
+        for w in lines:
+            # door through the horizontal wall at row w, and the vertical one at column w
+            cells[w, rng.integers(lo, hi)]= FREE
+            cells[rng.integers(lo, hi), w] =FREE
+    return cells
+
+
+def random_obstacles(size, rng, density=0.25):
+    cells =np.where(rng.random((size, size))< density, WALL, FREE).astype(np.uint8)
+    # keep the biggest open region around the middle, wall off the rest
+    free= np.flatnonzero(cells.ravel()== FREE)
+    seed_idx =free[np.argmin(np.abs(free- cells.size// 2))]
+    keep= reachable(cells, seed_idx)
+    cells.ravel()[~keep]= WALL
+    return cells
+
+
+def reachable(cells, start_idx):
+    # frontier-at-a-time bfs over the move table
+    nxt =build_next_idx(cells)
+    seen= np.zeros(cells.size, dtype=bool)
+    seen[start_idx] =True
+    frontier= np.array([start_idx])
+    while len(frontier):
+        cand =np.unique(nxt[frontier].ravel())
+        frontier= cand[~seen[cand]]
+        seen[frontier] =True
+    return seen
+
+
+def place(cells, rng, n_starts=1, n_goals=1, starts=None, goals=None):
+    flat =cells.ravel()
+    free= np.flatnonzero(flat== FREE)
+    if len(free)< n_starts+ n_goals:
+        raise ValueError('layout has too few free cells for the requested starts and goals')
+
+    def pick(explicit, n, default):
+        if explicit is not None:
+            idx= np.array([r* cells.shape[1]+ c for r, c in explicit])
+            if np.any(flat[idx]!= FREE):
+                raise ValueError('start/goal cells must be free')
+            return idx
+        if n== 1:
+            return np.array([default])
+        return rng.choice(free, size=n, replace=False)
+
+    # single start/goal default to the top-left and bottom-right free cells
+    s_idx =pick(starts, n_starts, free[0])
+    flat[s_idx]= START
+    free =np.flatnonzero(flat== FREE)
+    g_idx= pick(goals, n_goals, free[-1])
+    flat[g_idx] =GOAL
+    return cells
+
+
+def check_options(kind, opts, allowed_extra=()):
+    # unknown options would be ignored but still change the cache key
+    if kind not in KINDS:
+        raise ValueError('unknown layout kind: %s' % kind)
+    unknown =sorted(set(opts)- set(KIND_OPTIONS[kind])- set(allowed_extra))
+    if unknown:
+        raise ValueError('unknown options for %s layouts: %s' % (kind, ', '.join(unknown)))
+
+
+def generate(kind, size, layout_seed=0, n_starts=1, n_goals=1, starts=None, goals=None, **opts):
+    check_options(kind, opts)
+    if not MIN_SIZE<= size<= MAX_SIZE:
+        raise ValueError('size must be between %d and %d' % (MIN_SIZE, MAX_SIZE))
+
+    rng =make_rng(layout_seed)
+    if kind== 'maze':
+        cells =maze(size, rng)
+    elif kind =='rooms':
+        cells= rooms(size, rng, opts.get('room_size'))
+    else:
+        cells =random_obstacles(size, rng, opts.get('density', 0.25))
+    return place(cells, rng, n_starts, n_goals, starts, goals)
+
+
+def layout_path(kind, size, layout_seed, **opts):
+    key =json.dumps(dict(opts, kind=kind, size=size, seed=layout_seed, v=GEN_VERSION), sort_keys=True)
+    tag= hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return os.path.join(CACHE_DIR, '%s_%d_%s_%s.npy' % (kind, size, layout_seed, tag))
+
+
+def cached_layout(kind, size, layout_seed=0, **opts):
+    check_options(kind, opts, PLACE_OPTIONS)
+    path =layout_path(kind, size, layout_seed, **opts)
+    if os.path.exists(path):
+        return np.load(path)
+
+    cells= generate(kind, size, layout_seed, **opts)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # write-then-rename so a concurrent reader never sees half a file
+    tmp =path+ '.%d.tmp.npy' % os.getpid()
+    np.save(tmp, cells)
+    os.replace(tmp, path)
+    return cells
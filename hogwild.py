@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from seeding import split_rng
+from action_selection import make_selector
+from td_core import td_targets, td_update
+
+
+# hogwild-style q-learning: K worker processes, each with its own copy of the
+# env, all updating one q-table in shared memory without locks. lost updates
+# from racing writes are rare on big tables and the learner tolerates them.
+# n_workers defaults to the core count here; the web app caps it at its pool size
+
+
+class SharedTable:
+    # float64 table in a shared memory block, exposed as a numpy view (no copies)
+    def __init__(self, shape, name=None):
+        self.shape =tuple(shape)
+        nbytes= int(np.prod(self.shape))* 8
+        if name is None:
+            self.shm =shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner= True
+        else:
+            self.shm =shared_memory.SharedMemory(name=name)
+            self.owner= False
+        self.array =np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.array[:]= 0.0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # the view must go before the buffer can be released
+        self.array =None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker(table_name, shape, env, params, worker_rng, n_episodes, sync_every):
+    tbl =SharedTable(shape, table_name)
+    shared= tbl.array
+    env_rng, rng =split_rng(worker_rng)
+    env.seed(env_rng)
+
+    gamma =params.get('gamma', 0.99)
+    alpha= params.get('alpha', 0.1)
+    selector =make_selector(env, params, rng, n_episodes)
+
+    # sync_every=0 reads and writes the shared table directly. otherwise the
+    # worker learns on a private copy and every sync_every steps pushes its
+    # accumulated deltas and pulls a fresh copy, so reads are at most that stale
+    if sync_every> 0:
+        q =shared.copy()
+        base= q.copy()
+        touched =set()
+    else:
+        q= shared
+
+    returns =[]
+    finished_at= []
+    n_steps =0
+    t0= time.perf_counter()
+    try:
+        for ep in range(n_episodes):
+            selector.begin_episode(ep)
+            s =env.reset()
+            finished= False
+            total_r =0
+            step_cnt= 0
+
+            while not finished and step_cnt< 1000:
+                sid =env.state_to_idx(s)
+                # private copy of the row: another worker may write it while the
+                # selector is still comparing entries
+                a= selector.select(q[sid].copy(), sid)
+                s_next, r, finished =env.step(a)
+                sid_next= env.state_to_idx(s_next)
+                total_r +=r
+
+                td_update(q, (sid, a), td_targets('max', r, sid_next, finished, gamma, q), alpha)
+
+                if sync_every> 0:
+                    touched.add((sid, a))
+                    if (n_steps+ 1)% sync_every== 0:
+                        push(shared, q, base, touched)
+
+                s= s_next
+                step_cnt +=1
+                n_steps+= 1
+
+            returns.append(total_r)
+            finished_at.append(time.perf_counter())
+
+        if sync_every> 0:
+            push(shared, q, base, touched)
+    finally:
+        q =None
+        shared= None
+        tbl.close()
+
+    return {'returns': returns, 'finished_at': finished_at, 'steps': n_steps,
+            'seconds': time.perf_counter()- t0}
+
+
+def push(shared, q, base, touched):
+    if touched:
+        idx =tuple(np.array(list(touched)).T)
+        shared[idx] +=q[idx]- base[idx]
+        touched.clear()
+    q[:]= shared
+    base[:] =q
+
+
+def hogwild_q_learning(env, gamma=0.99, alpha=0.1, epsilon=0.1, n_episodes=500, callback=None, rng=None,
+                       params=None, n_workers=None, sync_every=0, recorder=None):
+    params =dict(params or {}, gamma=gamma, alpha=alpha, epsilon=epsilon)
+    n_workers= max(1, min(n_workers or os.cpu_count() or 1, n_episodes))
+    shape =(env.n_states, env.n_actions)
+
+    # episodes split as evenly as possible, one independent stream per worker
+    counts= [len(c) for c in np.array_split(np.arange(n_episodes), n_workers)]
+    worker_rngs =rng.spawn(n_workers)
+
+    tbl= SharedTable(shape)
+    try:
+        if recorder is not None:
+            recorder.record(0, q=tbl.array)
+        t0 =time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futs =[pool.submit(worker, tbl.name, shape, env, params, wr, n, sync_every)
+                   for wr, n in zip(worker_rngs, counts)]
+            outs= [f.result() for f in futs]
+        wall =time.perf_counter()- t0
+
+        # final policy extraction from a private copy, before the block goes away
+        q_table= tbl.array.copy()
+    finally:
+        tbl.close()
+
+    # merge the workers' episodes in the order they finished
+    eps= sorted((t, r) for o in outs for t, r in zip(o['finished_at'], o['returns']))
+    rewards_history =[r for _, r in eps]
+    if callback is not None:
+        for ep, r in enumerate(rewards_history):
+            callback(ep, r)
+    if recorder is not None:
+        recorder.record(len(rewards_history), force=True, q=q_table)
+
+    n_steps= sum(o['steps'] for o in outs)
+    stats ={
+        'n_workers': n_workers,
+        'env_steps': n_steps,
+        'steps_per_sec': n_steps/ wall if wall> 0 else 0.0,
+        'worker_steps_per_sec': [o['steps']/ o['seconds'] if o['seconds']> 0 else 0.0 for o in outs],
+    }
+    pol =np.argmax(q_table, axis=1)
+    return pol, q_table, rewards_history, stats
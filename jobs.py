@@ -0,0 +1,19 @@
+from environments import get_environment
+from algorithms import run_algorithm
+from snapshots import recorder_from_params
+from tiles import state_dims
+
+
+# runs in worker processes, so it only takes picklable arguments and builds
+# its own environment from the (name, params) spec
+def train_job(env_name, env_params, algo, params, snapshot_every=0):
+    env =get_environment(env_name, **env_params)
+    rec= recorder_from_params(params, snapshot_every)
+    result =run_algorithm(env, algo, params, recorder=rec)
+    return {
+        'result': result,
+        'snapshots': rec,
+        'dims': state_dims(env),
+        'n_actions': env.n_actions,
+        'n_states': env.n_states,
+    }
@@ -0,0 +1,114 @@
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+
+def call(base, path, body=None):
+    data =json.dumps(body).encode() if body is not None else None
+    req= urllib.request.Request(base+ path, data=data, method='POST' if body is not None else 'GET',
+                                headers={'Content-Type': 'application/json'})
+    t0 =time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            resp.read()
+            code =resp.status
+    except urllib.error.HTTPError as e:
+        code= e.code
+    return code, time.perf_counter()- t0
+
+
+def light_client(base, stop, lat, n_max):
+    i =0
+    while not stop.is_set() and i< n_max:
+        code, dt= call(base, '/api/step', {'action': i% 4})
+        lat.append(dt)
+        code, dt =call(base, '/api/get_logs')
+        lat.append(dt)
+        i +=1
+
+
+def train_client(base, stop, codes, params, algo):
+    while not stop.is_set():
+        code, dt =call(base, '/api/train', {'algorithm': algo, 'params': params})
+        codes.append(code)
+        if code== 503:
+            time.sleep(0.2)
+
+
+def measure(base, n_light, n_requests, n_train=0, train_params=None, algo='q_learning'):
+    stop =threading.Event()
+    lat= []
+    codes =[]
+    trainers= [threading.Thread(target=train_client, args=(base, stop, codes, train_params, algo), daemon=True)
+               for _ in range(n_train)]
+    for t in trainers:
+        t.start()
+    if n_train:
+        # let training actually get going before measuring
+        time.sleep(1.0)
+
+    lights =[threading.Thread(target=light_client, args=(base, stop, lat, n_requests)) for _ in range(n_light)]
+    for t in lights:
+        t.start()
+    for t in lights:
+        t.join()
+    stop.set()
+    for t in trainers:
+        t.join()
+
+    ms =np.array(lat)* 1000
+    return {
+        'requests': len(ms),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'train_ok': codes.count(200),
+        'train_503': codes.count(503),
+    }
+
+
+def start_local_server():
+    from werkzeug.serving import make_server
+    import app as rl_app
+
+    srv =make_server('127.0.0.1', 0, rl_app.app, threaded=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, 'http://127.0.0.1:%d' % srv.server_port
+
+
+def main(argv=None):
+    ap =argparse.ArgumentParser(description='latency of light endpoints with and without concurrent training')
+    ap.add_argument('--url', default=None, help='server to test; default starts one in-process')
+    ap.add_argument('--env', default='cliffwalking')
+    ap.add_argument('--light-clients', type=int, default=4)
+    ap.add_argument('--requests', type=int, default=200, help='step+logs pairs per light client')
+    ap.add_argument('--train-clients', type=int, default=4)
+    ap.add_argument('--episodes', type=int, default=3000)
+    args= ap.parse_args(argv)
+
+    srv =None
+    base= args.url
+    if base is None:
+        srv, base =start_local_server()
+
+    call(base, '/api/init_env', {'env': args.env, 'params': {}})
+    params ={'n_episodes': args.episodes, 'seed': 0}
+
+    idle= measure(base, args.light_clients, args.requests)
+    loaded =measure(base, args.light_clients, args.requests, args.train_clients, params)
+
+    for name, r in (('idle', idle), ('training', loaded)):
+        print('%-9s %5d reqs  p50 %7.2f ms  p99 %7.2f ms  train ok %d  503 %d' % (
+            name, r['requests'], r['p50_ms'], r['p99_ms'], r['train_ok'], r['train_503']))
+
+    if srv is not None:
+        srv.shutdown()
+    return 0
+
+
+if __name__ =='__main__':
+    raise SystemExit(main())
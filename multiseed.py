@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from seeding import spawn_seeds
+from jobs import train_job
+
+
+QUANTILES =(0.1, 0.25, 0.5, 0.75, 0.9)
+# dp histories are convergence residuals (lower is better); td/n_step_td
+# track value estimates of a random policy, so no seed is "best" there
+RESIDUAL_ALGOS =('policy_iteration', 'modified_policy_iteration', 'value_iteration')
+PREDICTION_ALGOS= ('td', 'n_step_td')
+
+
+def stack_curves(histories):
+    # (n_seeds, n_points); early-stopped runs are padded with their last value
+    n =max(len(h) for h in histories)
+    out= np.empty((len(histories), n))
+    for i, h in enumerate(histories):
+        h =np.asarray(h, dtype=float)
+        out[i, :len(h)]= h
+        out[i, len(h):] =h[-1] if len(h) else np.nan
+    return out
+
+
+def curve_stats(curves):
+    n =curves.shape[0]
+    sem= curves.std(axis=0, ddof=1)/ np.sqrt(n) if n> 1 else np.zeros(curves.shape[1])
+    qs =np.quantile(curves, QUANTILES, axis=0)
+    return {
+        'mean': curves.mean(axis=0),
+        'sem': sem,
+        'quantiles': {str(q): qs[i] for i, q in enumerate(QUANTILES)},
+    }
+
+
+def majority_policy(policies, n_actions):
+    # per-state vote across seeds; ties go to the lowest action index
+    policies =np.asarray(policies, dtype=np.int64)
+    n_seeds, n_states= policies.shape
+    counts =np.zeros((n_states, n_actions), dtype=np.int64)
+    np.add.at(counts, (np.tile(np.arange(n_states), n_seeds), policies.ravel()), 1)
+    return counts.argmax(axis=1)
+
+
+def history_order(algo):
+    if algo in RESIDUAL_ALGOS:
+        return 'min'
+    if algo in PREDICTION_ALGOS:
+        return None
+    return 'max'
+
+
+def best_seed(curves, order='max', tail=0.1):
+    # seed with the best average over the last `tail` of its curve
+    k =max(1, int(round(curves.shape[1]* tail)))
+    tail_mean= curves[:, -k:].mean(axis=1)
+    return int(np.argmin(tail_mean) if order== 'min' else np.argmax(tail_mean))
+
+
+def summarize(results, n_actions, order='max'):
+    curves =stack_curves([r['history'] for r in results])
+    stats= curve_stats(curves)
+
+    out= {
+        'n_seeds': len(results),
+        'history': stats['mean'].tolist(),
+        'history_sem': stats['sem'].tolist(),
+        'history_quantiles': {q: v.tolist() for q, v in stats['quantiles'].items()},
+        'policy': majority_policy([r['policy'] for r in results], n_actions).tolist(),
+        'values': np.mean([r['values'] for r in results], axis=0).tolist(),
+    }
+    if order is not None:
+        best =best_seed(curves, order)
+        out['best_seed']= best
+        out['best_policy'] =list(results[best]['policy'])
+    if all('q_values' in r for r in results):
+        out['q_values'] =np.mean([r['q_values'] for r in results], axis=0).tolist()
+    return out
+
+
+def run_seeds(env_name, env_params, algo, params, n_seeds, executor=None):
+    # independent SeedSequence children of params['seed'], one job per seed
+    seeds =spawn_seeds(params.get('seed'), n_seeds)
+    jobs= [dict(params, seed=ss) for ss in seeds]
+
+    own =executor is None
+    if own:
+        executor= ProcessPoolExecutor(max_workers=min(n_seeds, os.cpu_count() or 1))
+    try:
+        futs =[executor.submit(train_job, env_name, env_params, algo, p) for p in jobs]
+        done= [f.result() for f in futs]
+    finally:
+        if own:
+            executor.shutdown()
+
+    results =[d['result'] for d in done]
+    for r in results:
+        if 'error' in r:
+            return r
+    out= summarize(results, done[0]['n_actions'], history_order(algo))
+    out['dims'] =done[0]['dims']
+    out['n_states']= done[0]['n_states']
+    out['n_actions'] =done[0]['n_actions']
+    return out
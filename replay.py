@@ -0,0 +1,134 @@
+import numpy as np
+
+from seeding import make_rng
+from td_core import td_targets, td_update
+
+
+class ReplayBuffer:
+    # fixed-capacity ring buffer stored as one array per field
+    def __init__(self, capacity, rng=None):
+        self.capacity =int(capacity)
+        self.rng= make_rng(rng)
+        self.s =np.zeros(self.capacity, dtype=np.int64)
+        self.a= np.zeros(self.capacity, dtype=np.int64)
+        self.r =np.zeros(self.capacity)
+        self.s2= np.zeros(self.capacity, dtype=np.int64)
+        self.done =np.zeros(self.capacity, dtype=bool)
+        self.pos= 0
+        self.size =0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, s, a, r, s2, done):
+        i =self.pos
+        self.s[i]= s
+        self.a[i] =a
+        self.r[i]= r
+        self.s2[i] =s2
+        self.done[i]= done
+        self.pos =(i+ 1)% self.capacity
+        self.size= min(self.size+ 1, self.capacity)
+        return i
+
+    def sample(self, batch_size):
+        idx =self.rng.integers(0, self.size, size=batch_size)
+        return idx, self.s[idx], self.a[idx], self.r[idx], self.s2[idx], self.done[idx], None
+
+    def update_priorities(self, idx, td_err):
+        pass
+
+
+class SumTree:
+    # binary tree over `capacity` leaves kept in a flat array; node i has
+    # children 2i and 2i+1 and the leaves live at [cap, 2*cap)
+    def __init__(self, capacity):
+        cap =1
+        while cap< capacity:
+            cap *=2
+        self.cap= cap
+        self.tree =np.zeros(2* cap)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, vals):
+        if np.ndim(idx)== 0:
+            # single leaf: a plain walk up is cheaper than the array path
+            i =int(idx)+ self.cap
+            tree= self.tree
+            tree[i] =vals
+            i //=2
+            while i>= 1:
+                tree[i]= tree[2* i]+ tree[2* i+ 1]
+                i //=2
+            return
+        idx =np.atleast_1d(np.asarray(idx, dtype=np.int64))+ self.cap
+        self.tree[idx]= vals
+        # leaves at the same depth share a level, so fix parents one level at a time
+        idx =np.unique(idx// 2)
+        while idx[0]>= 1:
+            self.tree[idx]= self.tree[2* idx]+ self.tree[2* idx+ 1]
+            if idx[0]== 1:
+                break
+            idx =np.unique(idx// 2)
+
+    def find(self, mass):
+        # descend all queries together, one level per iteration
+        node =np.ones(len(mass), dtype=np.int64)
+        mass= np.asarray(mass, dtype=float).copy()
+        while node[0]< self.cap:
+            left =2* node
+            lv= self.tree[left]
+            go_right =mass> lv
+            mass[go_right] -=lv[go_right]
+            node= left+ go_right
+        return node- self.cap
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, rng=None, alpha=0.6, beta=0.4, eps=1e-3):
+        super().__init__(capacity, rng)
+        self.tree =SumTree(self.capacity)
+        self.alpha= alpha
+        self.beta =beta
+        self.eps= eps
+        self.max_prio =1.0
+
+    def add(self, s, a, r, s2, done):
+        i =super().add(s, a, r, s2, done)
+        self.tree.update(i, self.max_prio)
+        return i
+
+    def sample(self, batch_size):
+        # stratified: one draw per equal slice of the total priority mass
+        tot =self.tree.total()
+        seg= tot/ batch_size
+        mass =(np.arange(batch_size)+ self.rng.random(batch_size))* seg
+        idx= np.minimum(self.tree.find(mass), self.size- 1)
+
+        p =self.tree.tree[idx+ self.tree.cap]/ tot
+        w= (self.size* np.maximum(p, 1e-12))** (-self.beta)
+        w /=w.max()
+        return idx, self.s[idx], self.a[idx], self.r[idx], self.s2[idx], self.done[idx], w
+
+    def update_priorities(self, idx, td_err):
+        prio =(np.abs(td_err)+ self.eps)** self.alpha
+        self.max_prio= max(self.max_prio, float(prio.max()))
+        self.tree.update(idx, prio)
+
+
+def batched_q_update(q_table, s, a, r, s2, done, alpha, gamma, weights=None):
+    # one minibatch of q-learning updates; targets are all computed from the
+    # table before the batch, and repeated (s, a) pairs get one mean step
+    target =td_targets('max', r, s2, done, gamma, q_table)
+    return td_update(q_table, (s, a), target, alpha, weights)
+
+
+def make_replay(params, rng=None):
+    size =params.get('replay_size', 0)
+    if not size:
+        return None
+    if params.get('prioritized', False):
+        return PrioritizedReplayBuffer(size, rng, params.get('per_alpha', 0.6), params.get('per_beta', 0.4))
+    return ReplayBuffer(size, rng)
@@ -0,0 +1,92 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def policy_key(spec, policy, max_steps):
+    # env spec + policy bytes + step cap identify a deterministic rollout
+    h =hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(spec, sort_keys=True, default=str).encode())
+    h.update(np.ascontiguousarray(policy, dtype=np.int64).tobytes())
+    h.update(str(int(max_steps)).encode())
+    return h.hexdigest()
+
+
+def frame_line(obj):
+    return json.dumps(obj)+ '\n'
+
+
+def private_copy(env):
+    # shallow copy: the layout tables (next_idx, cells, blocks) are read-only
+    # and shared, position state is reassigned on every step anyway. only a
+    # wrapped gymnasium env mutates in place, so that one is deep-copied
+    clone =copy.copy(env)
+    if hasattr(env, 'env'):
+        clone.env= copy.deepcopy(env.env)
+    return clone
+
+
+def rollout_lines(env, policy, max_steps):
+    # one ndjson line per step as soon as it is taken, then a summary line
+    st =env.reset()
+    tot_rew= 0.0
+    finished =False
+    step_cnt= 0
+    while not finished and step_cnt< max_steps:
+        act =int(policy[env.state_to_idx(st)])
+        nxt_st, rew, finished= env.step(act)
+        tot_rew +=rew
+        step_cnt+= 1
+        yield frame_line({
+            'step': step_cnt,
+            'state': list(nxt_st) if isinstance(nxt_st, tuple) else nxt_st,
+            'action': act,
+            'reward': float(rew),
+            'done': bool(finished),
+        })
+        st =nxt_st
+    yield frame_line({'summary': {'steps': step_cnt, 'total_reward': float(tot_rew), 'success': bool(finished),
+                                  'cached': False}})
+
+
+class RolloutCache:
+    # lru of finished rollouts (lists of ndjson lines) for deterministic envs
+    def __init__(self, max_entries=32):
+        self.max_entries =max_entries
+        self.entries= OrderedDict()
+        self.lock =threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            lines =self.entries.get(key)
+            if lines is not None:
+                self.entries.move_to_end(key)
+            return lines
+
+    def put(self, key, lines):
+        with self.lock:
+            self.entries[key] =lines
+            self.entries.move_to_end(key)
+            while len(self.entries)> self.max_entries:
+                self.entries.popitem(last=False)
+
+    def replay(self, lines):
+        for ln in lines[:-1]:
+            yield ln
+        summary= json.loads(lines[-1])
+        summary['summary']['cached'] =True
+        yield frame_line(summary)
+
+    def stream(self, key, env, policy, max_steps):
+        # streams a fresh rollout and caches it once it ran to the end
+        # (a client that disconnects early caches nothing)
+        done= []
+        for ln in rollout_lines(env, policy, max_steps):
+            done.append(ln)
+            yield ln
+        if key is not None:
+            self.put(key, done)
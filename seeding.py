@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def make_rng(seed=None):
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_seeds(seed, n):
+    # independent child streams for parallel workers; SeedSequences pickle cleanly
+    if isinstance(seed, np.random.SeedSequence):
+        return seed.spawn(n)
+    return np.random.SeedSequence(seed).spawn(n)
+
+
+def split_rng(seed=None):
+    # one stream for the environment, one for the learner
+    if isinstance(seed, np.random.Generator):
+        env_rng, algo_rng= seed.spawn(2)
+        return env_rng, algo_rng
+    env_ss, algo_ss =spawn_seeds(seed, 2)
+    return np.random.default_rng(env_ss), np.random.default_rng(algo_ss)
+
+
+class UniformBlock:
+    # hands out uniform [0,1) draws from a pre-drawn block, refilled in bulk
+    def __init__(self, rng, block_size=4096):
+        self.rng =rng
+        self.block_size= block_size
+        self.buf =rng.random(block_size)
+        self.pos= 0
+
+    def next(self):
+        if self.pos>= self.block_size:
+            self.buf =self.rng.random(self.block_size)
+            self.pos= 0
+        u =self.buf[self.pos]
+        self.pos +=1
+        return u
+
+    def integer(self, n):
+        return min(int(self.next()* n), n-1)
+
+    def take(self, n):
+        if self.pos+ n> self.block_size:
+            self.buf =np.concatenate([self.buf[self.pos:], self.rng.random(max(n, self.block_size))])
+            self.block_size= len(self.buf)
+            self.pos =0
+        out= self.buf[self.pos:self.pos+ n]
+        self.pos +=n
+        return out
@@ -0,0 +1,97 @@
+import zlib
+from bisect import bisect_right
+
+import numpy as np
+
+
+def _pack(arr):
+    return zlib.compress(np.ascontiguousarray(arr).tobytes(), 1)
+
+
+def _unpack(blob, dtype, shape=-1):
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype).reshape(shape)
+
+
+class SnapshotRecorder:
+    # records learner state (q / v / policy arrays) every `every` steps as
+    # sparse deltas against the previous snapshot, with a full keyframe every
+    # `keyframe_every` snapshots. everything is stored zlib-compressed, so
+    # memory grows with the number of entries that change
+    def __init__(self, every=10, keyframe_every=20):
+        self.every =max(1, int(every))
+        self.keyframe_every= max(1, int(keyframe_every))
+        self.steps =[]
+        self.frames= []
+        self._prev ={}
+        self._since_key= 0
+
+    def __len__(self):
+        return len(self.steps)
+
+    def nbytes(self):
+        tot =0
+        for fr in self.frames:
+            for ent in fr['arrays'].values():
+                tot +=sum(len(b) for b in ent[2:])
+        return tot
+
+    def record(self, step, force=False, **arrays):
+        if not force and step% self.every:
+            return
+        if self.steps and self.steps[-1]== step:
+            return
+
+        is_key =not self.frames or self._since_key+ 1>= self.keyframe_every \
+            or set(arrays)!= set(self._prev)
+        entry ={}
+        for name, arr in arrays.items():
+            arr= np.asarray(arr)
+            flat =arr.ravel()
+            prev= self._prev.get(name)
+            if is_key or prev is None or prev.shape!= flat.shape:
+                is_key =True
+                break
+            idx= np.flatnonzero(flat!= prev).astype(np.uint32)
+            # gaps between sorted indices are small and compress well
+            entry[name] =(arr.shape, arr.dtype.str, _pack(np.diff(idx, prepend=np.uint32(0))), _pack(flat[idx]))
+
+        if is_key:
+            entry ={name: (np.shape(arr), np.asarray(arr).dtype.str, _pack(np.asarray(arr)))
+                    for name, arr in arrays.items()}
+            self._since_key= 0
+        else:
+            self._since_key +=1
+
+        for name, arr in arrays.items():
+            self._prev[name]= np.array(arr, copy=True).ravel()
+
+        self.steps.append(int(step))
+        self.frames.append({'key': is_key, 'arrays': entry})
+
+    def state_at(self, step):
+        # latest snapshot at or before `step`, rebuilt from its keyframe
+        if not self.steps:
+            return None, {}
+        i =max(0, bisect_right(self.steps, step)- 1)
+        k= i
+        while not self.frames[k]['key']:
+            k -=1
+
+        out ={}
+        for name, (shape, dt, blob) in self.frames[k]['arrays'].items():
+            out[name]= _unpack(blob, dt).copy()
+
+        for j in range(k+ 1, i+ 1):
+            for name, (shape, dt, idx_blob, val_blob) in self.frames[j]['arrays'].items():
+                idx =np.cumsum(_unpack(idx_blob, np.uint32), dtype=np.int64)
+                out[name][idx]= _unpack(val_blob, dt)
+
+        shapes ={name: ent[0] for name, ent in self.frames[k]['arrays'].items()}
+        return self.steps[i], {name: arr.reshape(shapes[name]) for name, arr in out.items()}
+
+
+def recorder_from_params(params, default_every=0):
+    every =params.get('snapshot_every', default_every)
+    if not every:
+        return None
+    return SnapshotRecorder(every, params.get('keyframe_every', 20))
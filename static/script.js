@@ -3,6 +3,10 @@ let envInfo = null;
 let currentPolicy = null;
 let currentValues = null;
 let trainHistory = null;
+let trainBand = null;
+let currentModelId = null;
+let currentTile = null;
+let snapshotSteps = [];
 
 // DOM elements
 const envSelect = document.getElementById('env-select');
@@ -17,6 +21,7 @@ const alphaSlider = document.getElementById('alpha');
 const epsilonSlider = document.getElementById('epsilon');
 const episodesSlider = document.getElementById('episodes');
 const nStepSlider = document.getElementById('n-step');
+const nSeedsSlider = document.getElementById('n-seeds');
 
 const envCanvas = document.getElementById('env-canvas');
 const envCtx = envCanvas.getContext('2d');
@@ -31,27 +36,36 @@ alphaSlider.oninput = () => document.getElementById('alpha-val').textContent = a
 epsilonSlider.oninput = () => document.getElementById('epsilon-val').textContent = epsilonSlider.value;
 episodesSlider.oninput = () => document.getElementById('episodes-val').textContent = episodesSlider.value;
 nStepSlider.oninput = () => document.getElementById('n-step-val').textContent = nStepSlider.value;
+nSeedsSlider.oninput = () => document.getElementById('n-seeds-val').textContent = nSeedsSlider.value;
 
 // algorithm descriptions
 const algoDescriptions = {
     'policy_iteration': 'Iteratively evaluates current policy then improves it. Guaranteed to converge to optimal policy.',
+    'modified_policy_iteration': 'Policy iteration with a few warm-started evaluation sweeps, only revisiting states whose successors changed. Much faster on big grids.',
     'value_iteration': 'Directly computes optimal value function by taking max over actions at each state.',
     'monte_carlo': 'Learns from complete episodes. Updates Q-values based on actual returns.',
     'td': 'TD(0) - Updates value estimates after each step using bootstrapping.',
     'n_step_td': 'N-step TD - Uses n-step returns for value updates. Trades off between MC and TD(0).',
     'sarsa': 'On-policy TD control. Updates Q(s,a) using the action actually taken in next state.',
-    'q_learning': 'Off-policy TD control. Updates Q(s,a) using max action value in next state.'
+    'q_learning': 'Off-policy TD control. Updates Q(s,a) using max action value in next state.',
+    'expected_sarsa': 'Like SARSA but uses the expected next Q-value under the epsilon-greedy policy. Tolerates much larger alpha.',
+    'double_q_learning': 'Keeps two Q-tables; one picks the next action, the other evaluates it. Reduces overestimation.',
+    'hogwild_q_learning': 'Q-Learning with several worker processes updating one shared Q-table without locks. Faster on big state spaces.'
 };
 
 // algorithm-level parameter defaults (simplified)
 const algorithmDefaults = {
     'policy_iteration': {gamma: 0.99, alpha: 0.1, epsilon: 0.1, episodes: 100, n_step: 3},
+    'modified_policy_iteration': {gamma: 0.99, alpha: 0.1, epsilon: 0.1, episodes: 100, n_step: 3},
     'value_iteration': {gamma: 0.99, alpha: 0.1, epsilon: 0.1, episodes: 100, n_step: 3},
     'monte_carlo': {gamma: 0.99, alpha: 0.1, epsilon: 0.2, episodes: 1000, n_step: 3},
     'td': {gamma: 0.99, alpha: 0.5, epsilon: 0.2, episodes: 1500, n_step: 3},
     'n_step_td': {gamma: 0.99, alpha: 0.5, epsilon: 0.2, episodes: 1500, n_step: 5},
     'sarsa': {gamma: 0.99, alpha: 0.1, epsilon: 0.2, episodes: 1000, n_step: 3},
-    'q_learning': {gamma: 0.99, alpha: 0.1, epsilon: 0.2, episodes: 1000, n_step: 3}
+    'q_learning': {gamma: 0.99, alpha: 0.1, epsilon: 0.2, episodes: 1000, n_step: 3},
+    'expected_sarsa': {gamma: 0.99, alpha: 0.9, epsilon: 0.1, episodes: 300, n_step: 3},
+    'double_q_learning': {gamma: 0.99, alpha: 0.1, epsilon: 0.2, episodes: 1000, n_step: 3},
+    'hogwild_q_learning': {gamma: 0.99, alpha: 0.1, epsilon: 0.1, episodes: 2000, n_step: 3}
 };
 
 // load parameters for current algorithm
@@ -117,6 +131,10 @@ initEnvBtn.onclick = async () => {
 
         currentPolicy = null;
         currentValues = null;
+        currentModelId = null;
+        currentTile = null;
+        snapshotSteps = [];
+        timelineRow.style.display = 'none';
 
         document.getElementById('current-state').textContent = JSON.stringify(envInfo.state);
         document.getElementById('current-reward').textContent = '-';
@@ -147,6 +165,7 @@ trainBtn.onclick = async () => {
         epsilon: parseFloat(epsilonSlider.value),
         n_episodes: parseInt(episodesSlider.value),
         n_step: parseInt(nStepSlider.value),
+        n_seeds: parseInt(nSeedsSlider.value),
         theta: 1e-6
     };
 
@@ -206,9 +225,19 @@ trainBtn.onclick = async () => {
         progressText.textContent = '100%';
         currentEpisode.textContent = params.n_episodes;
 
-        currentPolicy = result.policy;
-        currentValues = result.values;
+        currentPolicy = result.policy || null;
+        currentValues = result.values || null;
+        currentModelId = result.model_id || null;
+        currentTile = null;
         trainHistory = result.history;
+        // 10-90% band across seeds when several were run
+        trainBand = result.history_quantiles ? [result.history_quantiles['0.1'], result.history_quantiles['0.9']] : null;
+
+        // large or non-grid state spaces are drawn from server-side tiles
+        const envName = envSelect.value;
+        if (result.tiled || envName === 'mountaincar' || envName === 'cartpole') {
+            await fetchValueTiles();
+        }
 
         // Calculate final convergence
         if (trainHistory.length > 0) {
@@ -229,6 +258,7 @@ trainBtn.onclick = async () => {
         drawValueFunction();
         drawChart();
         displayPolicy();
+        await loadTimeline();
 
         statusMessage.textContent = 'Training Complete!';
         statusMessage.style.color = '#4caf50';
@@ -255,22 +285,26 @@ trainBtn.onclick = async () => {
 
 // Run episode with learned policy
 runBtn.onclick = async () => {
-    if (!currentPolicy) {
+    if (!currentPolicy && !currentModelId) {
         alert('Train agent first!');
         return;
     }
 
     try {
-        const response = await fetch('/api/run_episode', {
+        const response = await fetch('/api/rollout', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ policy: currentPolicy })
+            body: JSON.stringify(currentPolicy ? { policy: currentPolicy } : { model_id: currentModelId })
         });
 
-        const result = await response.json();
+        if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+            const result = await response.json();
+            console.error('Error running episode:', result.error);
+            return;
+        }
 
-        // animate trajectory
-        animateTrajectory(result.trajectory);
+        // frames are drawn as they stream in
+        await animateTrajectory(response);
 
     } catch (err) {
         console.error('Error running episode:', err);
@@ -374,16 +408,21 @@ function drawGridEnv(ctx, width, height) {
     const cellW = width / size;
     const cellH = height / size;
 
-    // draw grid
-    for (let r = 0; r < size; r++) {
-        for (let c = 0; c < size; c++) {
-            const x = c * cellW;
-            const y = r * cellH;
+    // big layouts come with a pooled wall mask instead of per-cell obstacles
+    if (envInfo.wall_tile) {
+        ctx.drawImage(wallTileCanvas(envInfo.wall_tile, width, height), 0, 0);
+    } else {
+        // draw grid
+        for (let r = 0; r < size; r++) {
+            for (let c = 0; c < size; c++) {
+                const x = c * cellW;
+                const y = r * cellH;
 
-            ctx.fillStyle = '#ffffff';
-            ctx.fillRect(x, y, cellW, cellH);
-            ctx.strokeStyle = '#ccc';
-            ctx.strokeRect(x, y, cellW, cellH);
+                ctx.fillStyle = '#ffffff';
+                ctx.fillRect(x, y, cellW, cellH);
+                ctx.strokeStyle = '#ccc';
+                ctx.strokeRect(x, y, cellW, cellH);
+            }
         }
     }
 
@@ -395,7 +434,15 @@ function drawGridEnv(ctx, width, height) {
         }
     }
 
-    // draw holes for frozenlake
+    // draw hazards from gridworld map files
+    if (envInfo.hazards) {
+        ctx.fillStyle = '#8b4513';
+        for (const hz of envInfo.hazards) {
+            ctx.fillRect(hz[1] * cellW, hz[0] * cellH, cellW, cellH);
+        }
+    }
+
+    // draw holes for frozenlake (and gridworld map files)
     if (envInfo.holes) {
         ctx.fillStyle = '#4a90d9';
         for (const hole of envInfo.holes) {
@@ -407,13 +454,17 @@ function drawGridEnv(ctx, width, height) {
         }
     }
 
-    // draw goal
+    // draw goal (kept visible on big layouts where a cell is under a pixel)
     if (envInfo.goal) {
+        const gW = Math.max(cellW, 4);
+        const gH = Math.max(cellH, 4);
         ctx.fillStyle = '#4caf50';
-        ctx.fillRect(envInfo.goal[1] * cellW, envInfo.goal[0] * cellH, cellW, cellH);
-        ctx.fillStyle = '#fff';
-        ctx.font = '20px Arial';
-        ctx.fillText('G', envInfo.goal[1] * cellW + cellW/3, envInfo.goal[0] * cellH + cellH/1.5);
+        ctx.fillRect(envInfo.goal[1] * cellW, envInfo.goal[0] * cellH, gW, gH);
+        if (cellW >= 12) {
+            ctx.fillStyle = '#fff';
+            ctx.font = '20px Arial';
+            ctx.fillText('G', envInfo.goal[1] * cellW + cellW/3, envInfo.goal[0] * cellH + cellH/1.5);
+        }
     }
 
     // draw agent
@@ -422,11 +473,40 @@ function drawGridEnv(ctx, width, height) {
         const agentC = envInfo.state[1];
         ctx.fillStyle = '#f44336';
         ctx.beginPath();
-        ctx.arc(agentC * cellW + cellW/2, agentR * cellH + cellH/2, cellW/3, 0, Math.PI * 2);
+        ctx.arc(agentC * cellW + cellW/2, agentR * cellH + cellH/2, Math.max(cellW/3, 2), 0, Math.PI * 2);
         ctx.fill();
     }
 }
 
+// render the wall mask once per layout; animation frames just blit it
+function wallTileCanvas(tile, width, height) {
+    if (tile.canvas && tile.canvas.width === width && tile.canvas.height === height) return tile.canvas;
+
+    const off = document.createElement('canvas');
+    off.width = width;
+    off.height = height;
+    const octx = off.getContext('2d');
+    const rows = tile.values.length;
+    const cols = rows ? tile.values[0].length : 0;
+    const cellW = width / cols;
+    const cellH = height / rows;
+
+    octx.fillStyle = '#ffffff';
+    octx.fillRect(0, 0, width, height);
+    for (let r = 0; r < rows; r++) {
+        for (let c = 0; c < cols; c++) {
+            const frac = tile.values[r][c];
+            if (!frac) continue;
+            // shade by the fraction of walls in the block
+            const g = Math.floor(255 - frac * (255 - 0x33));
+            octx.fillStyle = `rgb(${g}, ${g}, ${g})`;
+            octx.fillRect(c * cellW, r * cellH, Math.ceil(cellW), Math.ceil(cellH));
+        }
+    }
+    tile.canvas = off;
+    return off;
+}
+
 function drawCliffEnv(ctx, width, height) {
     const h = envInfo.grid_height || 4;
     const w = envInfo.grid_width || 12;
@@ -556,8 +636,118 @@ function drawCartPole(ctx, width, height) {
     }
 }
 
+// fetch a downsampled value/policy tile that fits the value canvas
+async function fetchValueTiles(zoom = null, x0 = 0, y0 = 0) {
+    if (!currentModelId) return;
+
+    const body = { model_id: currentModelId, x0: x0, y0: y0, mode: 'mean' };
+    if (zoom === null) body.max_cells = 100;
+    else body.zoom = zoom;
+
+    try {
+        const response = await fetch('/api/tiles', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        const tile = await response.json();
+        if (!tile.error) currentTile = tile;
+    } catch (err) {
+        console.error('Error fetching tiles:', err);
+    }
+}
+
+// training timeline: scrub through recorded snapshots of the value function
+const timelineRow = document.getElementById('timeline-row');
+const timelineSlider = document.getElementById('timeline');
+let timelineTimer = null;
+
+async function loadTimeline() {
+    snapshotSteps = [];
+    timelineRow.style.display = 'none';
+    if (!currentModelId) return;
+
+    try {
+        const response = await fetch('/api/snapshot', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ model_id: currentModelId })
+        });
+        const info = await response.json();
+        if (info.error || !info.steps.length) return;
+
+        snapshotSteps = info.steps;
+        timelineSlider.max = snapshotSteps.length - 1;
+        timelineSlider.value = snapshotSteps.length - 1;
+        document.getElementById('timeline-val').textContent = snapshotSteps[snapshotSteps.length - 1];
+        timelineRow.style.display = 'block';
+    } catch (err) {
+        console.error('Error loading timeline:', err);
+    }
+}
+
+async function showSnapshot(step) {
+    try {
+        const response = await fetch('/api/snapshot', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ model_id: currentModelId, step: step })
+        });
+        const snap = await response.json();
+        if (snap.error) return;
+
+        if (snap.tile) {
+            currentTile = snap.tile;
+        } else {
+            currentValues = snap.values;
+            if (snap.policy) currentPolicy = snap.policy;
+        }
+        drawValueFunction();
+        displayPolicy();
+    } catch (err) {
+        console.error('Error fetching snapshot:', err);
+    }
+}
+
+timelineSlider.oninput = () => {
+    const step = snapshotSteps[parseInt(timelineSlider.value)];
+    document.getElementById('timeline-val').textContent = step;
+
+    // only fetch once the slider settles
+    clearTimeout(timelineTimer);
+    timelineTimer = setTimeout(() => showSnapshot(step), 80);
+};
+
+function drawTileValues(ctx, width, height) {
+    const rows = currentTile.values.length;
+    const cols = rows ? currentTile.values[0].length : 0;
+    if (!rows || !cols) return;
+
+    const cellW = width / cols;
+    const cellH = height / rows;
+    const minV = currentTile.min;
+    const range = (currentTile.max - minV) || 1;
+
+    for (let r = 0; r < rows; r++) {
+        for (let c = 0; c < cols; c++) {
+            const val = currentTile.values[r][c];
+            if (val === null) continue;
+            const norm = (val - minV) / range;
+
+            const red = Math.floor((1 - norm) * 255);
+            const green = Math.floor(norm * 255);
+            ctx.fillStyle = `rgb(${red}, ${green}, 100)`;
+            ctx.fillRect(c * cellW, r * cellH, Math.ceil(cellW), Math.ceil(cellH));
+        }
+    }
+
+    ctx.fillStyle = '#000';
+    ctx.font = '12px Arial';
+    ctx.fillText(`${currentTile.shape[0]}x${currentTile.shape[1]} @ 1/${currentTile.factor}`, 5, height - 5);
+}
+
 function drawValueFunction() {
-    if (!currentValues || !envInfo) return;
+    if ((!currentValues && !currentTile) || !envInfo) return;
 
     const ctx = valueCtx;
     const width = valueCanvas.width;
@@ -567,7 +757,9 @@ function drawValueFunction() {
 
     const envName = envSelect.value;
 
-    if (envName === 'gridworld' || envName === 'frozenlake') {
+    if (currentTile) {
+        drawTileValues(ctx, width, height);
+    } else if (envName === 'gridworld' || envName === 'frozenlake') {
         drawGridValues(ctx, width, height, envInfo.grid_size || 5);
     } else if (envName === 'cliffwalking') {
         drawCliffValues(ctx, width, height);
@@ -685,10 +877,28 @@ function drawChart() {
     // plot data
     const data = trainHistory;
     const n = data.length;
-    const minY = Math.min(...data);
-    const maxY = Math.max(...data);
+    const minY = trainBand ? Math.min(...trainBand[0]) : Math.min(...data);
+    const maxY = trainBand ? Math.max(...trainBand[1]) : Math.max(...data);
     const rangeY = maxY - minY || 1;
 
+    if (trainBand && n > 1) {
+        ctx.fillStyle = 'rgba(102, 126, 234, 0.2)';
+        ctx.beginPath();
+        for (let i = 0; i < n; i++) {
+            const x = padding + (i / (n - 1)) * chartW;
+            const y = height - padding - ((trainBand[1][i] - minY) / rangeY) * chartH;
+            if (i === 0) ctx.moveTo(x, y);
+            else ctx.lineTo(x, y);
+        }
+        for (let i = n - 1; i >= 0; i--) {
+            const x = padding + (i / (n - 1)) * chartW;
+            const y = height - padding - ((trainBand[0][i] - minY) / rangeY) * chartH;
+            ctx.lineTo(x, y);
+        }
+        ctx.closePath();
+        ctx.fill();
+    }
+
     ctx.strokeStyle = '#667eea';
     ctx.lineWidth = 2;
     ctx.beginPath();
@@ -724,7 +934,13 @@ function clearChart() {
 }
 
 function displayPolicy() {
-    if (!currentPolicy) return;
+    if (!currentPolicy) {
+        if (currentModelId) {
+            document.getElementById('policy-display').textContent =
+                'Policy: ' + envInfo.n_states + ' states (kept on server)';
+        }
+        return;
+    }
 
     const actions = ['↑', '↓', '←', '→', 'P', 'D'];
     const policyDiv = document.getElementById('policy-display');
@@ -767,7 +983,28 @@ function displayPolicy() {
     }
 }
 
-async function animateTrajectory(trajectory) {
+// yields parsed frames from an ndjson response as soon as each line arrives
+async function* readFrames(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+
+        let nl;
+        while ((nl = buf.indexOf('\n')) >= 0) {
+            const line = buf.slice(0, nl).trim();
+            buf = buf.slice(nl + 1);
+            if (line) yield JSON.parse(line);
+        }
+    }
+    if (buf.trim()) yield JSON.parse(buf);
+}
+
+async function animateTrajectory(response) {
     const episodeInfo = document.getElementById('episode-info');
     episodeInfo.style.display = 'block';
 
@@ -777,12 +1014,12 @@ async function animateTrajectory(trajectory) {
     runBtn.disabled = true;
     runBtn.textContent = 'Playing...';
 
-    for (let i = 0; i < trajectory.length; i++) {
-        const step = trajectory[i];
+    for await (const step of readFrames(response)) {
+        if (step.summary) continue;
         envInfo.state = step.state;
         cumulativeReward += step.reward;
 
-        document.getElementById('episode-step').textContent = i + 1;
+        document.getElementById('episode-step').textContent = step.step;
         document.getElementById('episode-action').textContent = actionNames[step.action] || step.action;
         document.getElementById('episode-total-reward').textContent = cumulativeReward.toFixed(2);
 
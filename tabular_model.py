@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class TabularModel:
+    # env.get_transitions flattened once into csr arrays: the outcomes of
+    # (s, a) live at ptr[s*na+a]:ptr[s*na+a+1]. pred_* is the reverse index,
+    # the states that can reach each state under some action
+    def __init__(self, env):
+        self.n_states =ns= env.n_states
+        self.n_actions= na =env.n_actions
+
+        ptr =np.zeros(ns* na+ 1, dtype=np.int64)
+        nxt, prob, rew, cont= [], [], [], []
+        for s in range(ns):
+            st =env.idx_to_state(s)
+            for a in range(na):
+                for nxt_st, p, r, terminal in env.get_transitions(st, a):
+                    nxt.append(env.state_to_idx(nxt_st))
+                    prob.append(p)
+                    rew.append(r)
+                    cont.append(0.0 if terminal else 1.0)
+                ptr[s* na+ a+ 1]= len(nxt)
+
+        self.ptr =ptr
+        self.nxt= np.asarray(nxt, dtype=np.int64)
+        self.prob =np.asarray(prob, dtype=float)
+        self.rew= np.asarray(rew, dtype=float)
+        self.cont =np.asarray(cont)
+
+        # reverse index, deduplicated so each (pred, succ) pair appears once
+        src =np.repeat(np.arange(ns* na)// na, np.diff(ptr))
+        pairs= np.unique(self.nxt* ns+ src)
+        succ, pred =np.divmod(pairs, ns)
+        self.pred_ptr= np.concatenate([[0], np.cumsum(np.bincount(succ, minlength=ns))])
+        self.pred_idx =pred
+
+    def _gather(self, ptr, rows):
+        # positions of all entries of the given csr rows, and which row each came from
+        starts =ptr[rows]
+        lens= ptr[rows+ 1]- starts
+        owner =np.repeat(np.arange(len(rows)), lens)
+        pos= np.arange(lens.sum())- np.repeat(np.cumsum(lens)- lens, lens)+ np.repeat(starts, lens)
+        return pos, owner
+
+    def backup(self, rows, v, gamma):
+        # expected one-step return of each flat (s*na+a) row under values v
+        pos, owner =self._gather(self.ptr, rows)
+        contrib= self.prob[pos]* (self.rew[pos]+ gamma* self.cont[pos]* v[self.nxt[pos]])
+        return np.bincount(owner, contrib, minlength=len(rows))
+
+    def predecessors(self, states):
+        pos, _ =self._gather(self.pred_ptr, states)
+        return np.unique(self.pred_idx[pos])
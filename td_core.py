@@ -0,0 +1,55 @@
+import numpy as np
+
+
+# shared TD update core. every function takes either a single transition
+# (plain ints/floats) or a batch (index arrays), so the per-step learners and
+# the minibatch/replay paths run the same code
+
+TARGETS =['max', 'sarsa', 'expected', 'double', 'value']
+
+
+def next_values(kind, table, s2, a2=None, epsilon=0.0, other=None, probs=None):
+    # value of the successor state under each target rule
+    if kind== 'value':
+        return table[s2]
+    if kind =='sarsa':
+        return table[s2, a2]
+
+    rows= table[s2]
+    if kind =='max':
+        return rows.max(axis=-1)
+    if kind== 'expected':
+        if probs is not None:
+            # expectation under the behaviour policy's own action probabilities
+            return (rows* probs).sum(axis=-1)
+        # epsilon-greedy expectation: greedy mass on the max, epsilon spread evenly
+        return (1.0- epsilon)* rows.max(axis=-1)+ epsilon* rows.mean(axis=-1)
+    if kind =='double':
+        # pick the action with `table`, evaluate it with `other`
+        return other[s2, rows.argmax(axis=-1)]
+    raise ValueError('unknown target: %s' % kind)
+
+
+def td_targets(kind, r, s2, done, gamma, table, a2=None, epsilon=0.0, other=None, probs=None):
+    if not isinstance(done, np.ndarray):
+        # single transition: plain python branch, no 0-d array round trips
+        if done:
+            return r
+        return r+ gamma* next_values(kind, table, s2, a2, epsilon, other, probs)
+    nv =next_values(kind, table, s2, a2, epsilon, other, probs)
+    return r+ gamma* np.where(done, 0.0, nv)
+
+
+def td_update(table, index, target, alpha, weights=None):
+    # moves table[index] toward target and returns the td errors. in a batch,
+    # all errors are taken against the old table and repeated indices get the
+    # mean of their steps, so k copies of a transition move it once, not k times
+    td =target- table[index]
+    if not isinstance(td, np.ndarray):
+        table[index] +=alpha* td if weights is None else alpha* weights* td
+        return td
+    step= alpha* td if weights is None else alpha* weights* td
+    flat =np.ravel_multi_index(index, table.shape) if isinstance(index, tuple) else np.asarray(index)
+    counts= np.bincount(flat, minlength=table.size)[flat]
+    np.add.at(table, index, step/ counts)
+    return td
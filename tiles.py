@@ -0,0 +1,107 @@
+import numpy as np
+
+
+def state_dims(env):
+    # shape of the state index space, matching each env's state_to_idx order
+    if hasattr(env, 'p_bins'):
+        return (env.p_bins, env.v_bins, env.a_bins, env.av_bins)
+    if hasattr(env, 'pos_b'):
+        return (env.pos_b, env.vel_b)
+    if hasattr(env, 'h'):
+        return (env.h, env.w)
+    if hasattr(env, 'sz'):
+        return (env.sz, env.sz)
+    return (1, env.n_states)
+
+
+def _pool_values(grid, f, mode):
+    if f== 1:
+        return grid
+    n_r, n_c =grid.shape
+    pr, pc= -n_r% f, -n_c% f
+    padded =np.pad(grid, ((0, pr), (0, pc)), constant_values=np.nan)
+    blocks= padded.reshape((n_r+ pr)// f, f, (n_c+ pc)// f, f)
+    if mode =='max':
+        return np.nanmax(blocks, axis=(1, 3))
+    return np.nanmean(blocks, axis=(1, 3))
+
+
+def _pool_counts(counts, f):
+    if f== 1:
+        return counts
+    n_r, n_c, na =counts.shape
+    pr, pc= -n_r% f, -n_c% f
+    padded =np.pad(counts, ((0, pr), (0, pc), (0, 0)))
+    return padded.reshape((n_r+ pr)// f, f, (n_c+ pc)// f, f, na).sum(axis=(1, 3))
+
+
+class TileStore:
+    # downsampled views of one trained model. each (axes, zoom, mode) level is
+    # pooled once and cached; tiles are slices of a cached level
+    def __init__(self, values, policy, dims, n_actions):
+        self.values =np.asarray(values, dtype=float).reshape(dims)
+        self.policy= np.asarray(policy, dtype=np.int64).reshape(dims)
+        self.dims =tuple(dims)
+        self.na= n_actions
+        self._levels ={}
+
+    def default_axes(self):
+        if len(self.dims)== 4:
+            # cartpole: pole angle vs angular velocity is the informative slice
+            return (2, 3)
+        return (0, 1)
+
+    def _project(self, axes, mode):
+        other =tuple(i for i in range(len(self.dims)) if i not in axes)
+        vals= self.values
+        counts =np.eye(self.na, dtype=np.int64)[self.policy]
+        if other:
+            vals =vals.max(axis=other) if mode== 'max' else vals.mean(axis=other)
+            counts= counts.sum(axis=other)
+        if axes[0]> axes[1]:
+            vals =vals.T
+            counts= counts.transpose(1, 0, 2)
+        return vals, counts
+
+    def level(self, zoom=0, mode='mean', axes=None):
+        axes =tuple(axes) if axes is not None else self.default_axes()
+        key= (axes, zoom, mode)
+        if key not in self._levels:
+            vals, counts =self._project(axes, mode)
+            f= 2** zoom
+            pooled_v =_pool_values(vals, f, mode)
+            # majority vote of the greedy actions inside each block
+            pooled_p= np.argmax(_pool_counts(counts, f), axis=2)
+            self._levels[key] =(pooled_v, pooled_p)
+        return self._levels[key]
+
+    def fit_zoom(self, max_cells, axes=None):
+        axes =tuple(axes) if axes is not None else self.default_axes()
+        side= max(self.dims[axes[0]], self.dims[axes[1]])
+        zoom =0
+        while side> max_cells:
+            side =-(-side// 2)
+            zoom+= 1
+        return zoom
+
+    def tile(self, zoom=0, x0=0, y0=0, w=None, h=None, mode='mean', axes=None):
+        vals, pol =self.level(zoom, mode, axes)
+        n_r, n_c= vals.shape
+        y0 =max(0, min(int(y0), n_r))
+        x0= max(0, min(int(x0), n_c))
+        y1 =n_r if h is None else min(n_r, y0+ int(h))
+        x1= n_c if w is None else min(n_c, x0+ int(w))
+
+        sub =vals[y0:y1, x0:x1]
+        return {
+            'zoom': zoom,
+            'factor': 2** zoom,
+            'shape': [n_r, n_c],
+            'x0': x0,
+            'y0': y0,
+            'values': np.where(np.isnan(sub), None, np.round(sub, 4)).tolist(),
+            'policy': pol[y0:y1, x0:x1].tolist(),
+            # level-wide range keeps colors consistent across neighbouring tiles
+            'min': float(np.nanmin(vals)),
+            'max': float(np.nanmax(vals)),
+        }
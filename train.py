@@ -0,0 +1,190 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from environments import get_environment
+from algorithms import run_algorithm
+from seeding import spawn_seeds
+from multiseed import summarize, history_order
+
+
+ALGOS =['policy_iteration', 'modified_policy_iteration', 'value_iteration', 'monte_carlo', 'td', 'n_step_td', 'sarsa', 'expected_sarsa',
+        'q_learning', 'double_q_learning', 'hogwild_q_learning']
+
+
+class CurveWriter:
+    # writes (step, value) rows to disk, flushing every `flush_every` rows
+    def __init__(self, path, fmt='csv', flush_every=50):
+        self.path =path
+        self.fmt= fmt
+        self.flush_every =max(1, flush_every)
+        self.pending= []
+        self.steps =[]
+        self.vals= []
+        self._fh =None
+        self._pq_writer= None
+
+        if fmt =='csv':
+            self._fh= open(path, 'w')
+            self._fh.write('step,value\n')
+            self._fh.flush()
+        elif fmt== 'parquet':
+            # fail before training starts, not at the first flush
+            if importlib.util.find_spec('pyarrow') is None:
+                raise SystemExit('parquet output needs pyarrow installed')
+        elif fmt !='npz':
+            raise ValueError('unknown curve format: %s' % fmt)
+
+    def __call__(self, step, value):
+        self.pending.append((int(step), float(value)))
+        if len(self.pending)>= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        if self.fmt== 'csv':
+            self._fh.write(''.join('%d,%r\n' % row for row in self.pending))
+            self._fh.flush()
+        elif self.fmt =='npz':
+            # npz can't be appended to, so rewrite it atomically
+            for st, v in self.pending:
+                self.steps.append(st)
+                self.vals.append(v)
+            tmp =self.path+ '.tmp.npz'
+            np.savez(tmp, step=np.array(self.steps, dtype=np.int64), value=np.array(self.vals))
+            os.replace(tmp, self.path)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tbl= pa.table({'step': [r[0] for r in self.pending], 'value': [r[1] for r in self.pending]})
+            if self._pq_writer is None:
+                self._pq_writer =pq.ParquetWriter(self.path, tbl.schema)
+            self._pq_writer.write_table(tbl)
+
+        self.pending =[]
+
+    def close(self):
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+
+
+def run_seed(env_name, env_params, algo, params, seed, out_dir, fmt, flush_every):
+    os.makedirs(out_dir, exist_ok=True)
+    env =get_environment(env_name, **env_params)
+
+    writer= CurveWriter(os.path.join(out_dir, 'curve.'+ fmt), fmt, flush_every)
+    t0 =time.time()
+    try:
+        result =run_algorithm(env, algo, params, callback=writer, rng=seed)
+    finally:
+        writer.close()
+    elapsed= time.time()- t0
+
+    if 'error' in result:
+        raise ValueError(result['error'])
+
+    np.save(os.path.join(out_dir, 'policy.npy'), np.asarray(result['policy'], dtype=np.int64))
+    np.save(os.path.join(out_dir, 'values.npy'), np.asarray(result['values']))
+    if 'q_values' in result:
+        np.save(os.path.join(out_dir, 'q_values.npy'), np.asarray(result['q_values']))
+
+    return {'out_dir': out_dir, 'seconds': elapsed, 'n_points': len(result['history']),
+            'history': result['history'], 'policy': result['policy'], 'values': result['values'],
+            'n_actions': env.n_actions}
+
+
+def write_aggregate(run_dir, names, summary):
+    # mean/sem/quantile curves across seeds plus the majority-vote policy
+    qs =sorted(summary['history_quantiles'])
+    cols= [summary['history'], summary['history_sem']]+ [summary['history_quantiles'][q] for q in qs]
+    with open(os.path.join(run_dir, 'aggregate.csv'), 'w') as f:
+        f.write(','.join(['step', 'mean', 'sem']+ ['q%s' % q for q in qs])+ '\n')
+        for i, row in enumerate(zip(*cols)):
+            f.write('%d,' % i+ ','.join('%r' % float(v) for v in row)+ '\n')
+    np.save(os.path.join(run_dir, 'policy_majority.npy'), np.asarray(summary['policy'], dtype=np.int64))
+    best =names[summary['best_seed']] if 'best_seed' in summary else 'n/a'
+    print('aggregate of %d seeds (best: %s) -> %s' % (summary['n_seeds'], best, run_dir))
+
+
+def build_parser():
+    ap =argparse.ArgumentParser(description='train an agent headless and write results to disk')
+    ap.add_argument('--env', default='gridworld')
+    ap.add_argument('--env-params', default='{}', help='json dict passed to get_environment')
+    ap.add_argument('--algo', default='q_learning', choices=ALGOS)
+    ap.add_argument('--gamma', type=float, default=0.99)
+    ap.add_argument('--alpha', type=float, default=0.1)
+    ap.add_argument('--epsilon', type=float, default=0.1)
+    ap.add_argument('--episodes', type=int, default=500)
+    ap.add_argument('--theta', type=float, default=1e-6)
+    ap.add_argument('--n-step', type=int, default=4)
+    ap.add_argument('--params', default='{}', help='extra json params, override the flags above')
+    ap.add_argument('--seeds', type=int, nargs='+', default=[0])
+    ap.add_argument('--n-seeds', type=int, default=None,
+                    help='spawn this many independent streams from the first --seeds value')
+    ap.add_argument('--workers', type=int, default=None, help='processes for multi-seed runs')
+    ap.add_argument('--out', default='runs')
+    ap.add_argument('--format', dest='fmt', default='csv', choices=['csv', 'npz', 'parquet'])
+    ap.add_argument('--flush-every', type=int, default=50)
+    return ap
+
+
+def main(argv=None):
+    args= build_parser().parse_args(argv)
+
+    env_params =json.loads(args.env_params)
+    params ={
+        'gamma': args.gamma,
+        'alpha': args.alpha,
+        'epsilon': args.epsilon,
+        'n_episodes': args.episodes,
+        'theta': args.theta,
+        'n_step': args.n_step,
+    }
+    params.update(json.loads(args.params))
+
+    run_dir =os.path.join(args.out, '%s_%s' % (args.env, args.algo))
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'config.json'), 'w') as f:
+        json.dump({'env': args.env, 'env_params': env_params, 'algorithm': args.algo,
+                   'params': params, 'seeds': args.seeds, 'n_seeds': args.n_seeds}, f, indent=2)
+
+    if args.n_seeds:
+        seeds =spawn_seeds(args.seeds[0], args.n_seeds)
+        names= ['seed_%d_%d' % (args.seeds[0], i) for i in range(args.n_seeds)]
+    else:
+        seeds= args.seeds
+        names =['seed_%d' % s for s in seeds]
+
+    jobs =[(args.env, env_params, args.algo, params, s, os.path.join(run_dir, nm),
+            args.fmt, args.flush_every) for s, nm in zip(seeds, names)]
+
+    if len(jobs)== 1:
+        results =[run_seed(*jobs[0])]
+    else:
+        n_work= args.workers or min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=n_work) as pool:
+            futs =[pool.submit(run_seed, *j) for j in jobs]
+            results= [f.result() for f in futs]
+
+    for nm, r in zip(names, results):
+        print('%s: %d points in %.2fs -> %s' % (nm, r['n_points'], r['seconds'], r['out_dir']))
+
+    if len(results)> 1:
+        write_aggregate(run_dir, names, summarize(results, results[0]['n_actions'], history_order(args.algo)))
+
+    return 0
+
+
+if __name__ =='__main__':
+    sys.exit(main())